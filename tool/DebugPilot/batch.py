@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import sys
+import os
+import csv
+import time
+import fnmatch
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Tuple
+
+from main import RecursiveDebugger
+from summary import summarize
+from utils.llm_client import set_concurrency_limit
+from utils.llm_replay import parse_latency
+from utils.logger import setup_logger
+
+COLUMNS = ["bug", "status", "root_cause", "method", "details", "methods", "iterations", "states",
+           "llm_calls", "cached", "prompt_tokens", "cached_tokens", "completion_tokens", "llm_s", "wall_s", "message"]
+
+
+def find_bugs(benchmark_dir: str, patterns: List[str]) -> List[Tuple[str, str]]:
+    # (project_id, bug_id) of every <project>_<bug> directory matching one of the patterns
+    # patterns are names or globs such as Lang_1 or "Lang_*"
+    available = []
+    for name in os.listdir(benchmark_dir):
+        if "_" in name and os.path.exists(os.path.join(benchmark_dir, name, "call_info.json")):
+            available.append(name)
+
+    selected = []
+    for pattern in patterns:
+        matched = [name for name in available if fnmatch.fnmatch(name, pattern)]
+        if not matched:
+            print(f"warning: no benchmark directory matches {pattern}")
+        for name in matched:
+            if name not in selected:
+                selected.append(name)
+
+    def order(name):
+        project, bug = name.rsplit("_", 1)
+        return (project, int(bug) if bug.isdigit() else bug)
+
+    return [tuple(name.rsplit("_", 1)) for name in sorted(selected, key=order)]
+
+
+def run_bug(project_id: str, bug_id: str, args) -> Dict[str, Any]:
+    row = {column: "" for column in COLUMNS}
+    row["bug"] = f"{project_id}_{bug_id}"
+    begin = time.perf_counter()
+
+    debugger = None
+    engine = None
+    try:
+        # a corrupt states.db, an unreadable cassette or a bad result dir fails this bug only
+        debugger = RecursiveDebugger(project_id, bug_id, args.trace_backend, use_cache=not args.no_cache,
+                                     benchmark_dir=args.benchmark_dir, result_dir=args.result_dir,
+                                     llm_mode=args.llm_mode, replay_latency=args.replay_latency,
+                                     accurate_dependency=args.accurate_dependency, speculative_k=args.speculate,
+                                     context_budget=args.context_budget,
+                                     value_budget=args.value_budget,
+                                     local_comparison=not args.no_local_comparison,
+                                     exact_usage=args.exact_usage)
+        engine = debugger.debug_engine
+        # every bug starts from a clean session, as interaction command 0 does
+        engine.state_store.clear()
+        result = debugger.run(None)
+        row["status"] = result.get("status", "success")
+        row["message"] = result.get("message", result.get("state", ""))
+
+        keys = engine.state_store.keys()
+        row["states"] = len(keys)
+        if keys:
+            row["methods"] = keys[-1][0]
+            row["iterations"] = len({key[:2] for key in keys})
+            last = engine.state_store.load(keys[-1])
+            location = last.get("result", {}).get("location")
+            row["root_cause"] = int(keys[-1][2] == 2 and location is not None and location.get("fault") == 1)
+            if row["root_cause"]:
+                row["method"] = last["result"].get("method_name", "")
+                row["details"] = location.get("details", "")
+
+        if args.summary and keys:
+            try:
+                summarize(project_id, bug_id, args.result_dir, args.benchmark_dir, store=engine.state_store)
+            except Exception as e:
+                debugger.logger.warning(f"Summary of {row['bug']} failed: {str(e)}")
+
+    except Exception as e:
+        row["status"] = "error"
+        row["message"] = str(e)
+    finally:
+        try:
+            if debugger is not None:
+                original = debugger.debug_data.get("original")
+                if hasattr(original, "close"):
+                    original.close()
+            if engine is not None:
+                engine.state_store.close()
+        except Exception as e:
+            row["status"] = "error"
+            row["message"] = row["message"] or f"Cleanup failed: {str(e)}"
+
+    if engine is not None:
+        metrics = engine.client.metrics.summary()
+        row["llm_calls"] = metrics["calls"]
+        row["cached"] = metrics["cached"]
+        row["prompt_tokens"] = metrics["prompt_tokens"]
+        row["cached_tokens"] = metrics["cached_tokens"]
+        row["completion_tokens"] = metrics["completion_tokens"]
+        row["llm_s"] = round(metrics["latency"], 2)
+    row["wall_s"] = round(time.perf_counter() - begin, 2)
+    return row
+
+
+def write_table(rows: List[Dict[str, Any]], output: str) -> str:
+    # output.csv for scripts, output.md for reading
+    with open(output + ".csv", 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    found = sum(1 for row in rows if row["root_cause"] == 1)
+    lines = [
+        "| " + " | ".join(COLUMNS) + " |",
+        "|" + "---|" * len(COLUMNS)
+    ]
+    for row in rows:
+        cells = [str(row[column]).replace("|", "\\|").replace("\n", " ") for column in COLUMNS]
+        lines.append("| " + " | ".join(cells) + " |")
+    lines.append("")
+    lines.append(f"{found}/{len(rows)} bugs with a root cause, "
+                 f"{sum(row['llm_calls'] or 0 for row in rows)} LLM calls, "
+                 f"{sum(row['prompt_tokens'] or 0 for row in rows)} prompt "
+                 f"({sum(row['cached_tokens'] or 0 for row in rows)} provider-cached) / "
+                 f"{sum(row['completion_tokens'] or 0 for row in rows)} completion tokens")
+    table = "\n".join(lines)
+    with open(output + ".md", 'w', encoding='utf-8') as f:
+        f.write(table + "\n")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DebugPilot batch mode - debug many bugs concurrently (run from this directory)')
+    parser.add_argument('bugs', nargs='+', help='Bugs as <project>_<bug>, globs allowed (e.g. "Lang_*")')
+    parser.add_argument('--benchmark-dir', default='benchmark', help='Directory holding <project>_<bug> data (default: benchmark)')
+    parser.add_argument('--result-dir', default='result', help='Directory for <project>_<bug> states (default: result)')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Bugs debugged at the same time (default: 4)')
+    parser.add_argument('--llm-concurrency', type=int, default=8, help='In-flight LLM calls across all bugs (default: 8)')
+    parser.add_argument('--trace-backend', choices=['sqlite', 'binary', 'json'], default='sqlite', help='Storage of original.json (default: sqlite)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    parser.add_argument('--llm-mode', choices=['live', 'record', 'replay'], default='live', help='Record every call to, or replay from, <result-dir>/<project>_<bug>/cassette.jsonl (default: live)')
+    parser.add_argument('--replay-latency', type=parse_latency, default='recorded', help='Simulated latency per replayed call: "recorded" or seconds (default: recorded)')
+    parser.add_argument('--accurate-dependency', action='store_true', help='Find the reader of each block output in the def-use index instead of the precomputed reverse field')
+    parser.add_argument('--speculate', type=int, default=1, metavar='K', help='Rank the blocks and evaluate the K most suspicious ones concurrently, the first inconsistent one is kept (default: 1, off)')
+    parser.add_argument('--context-budget', type=int, default=2048, help='Tokens of debugging context shown to an agent, older analyses are condensed or dropped beyond it; 0 shows all (default: 2048)')
+    parser.add_argument('--value-budget', type=int, default=4096, help='Tokens of block input / output values shown to Prediction and Comparison, long values, collections and nested calls are elided beyond it; 0 shows all (default: 4096)')
+    parser.add_argument('--no-local-comparison', action='store_true', help='Leave every oracle item to Agent Comparison instead of deciding literal values locally')
+    parser.add_argument('--exact-usage', action='store_true', help='Read every streamed answer on past </format> for the token usage the provider reports, cached tokens included, instead of counting tokens locally')
+    parser.add_argument('--summary', action='store_true', help='Write debugging_plan.json for every bug')
+    parser.add_argument('-o', '--output', default=None, help='Results table path without extension (default: <result-dir>/batch_results)')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.benchmark_dir):
+        print(f"error: {args.benchmark_dir} does not exist")
+        sys.exit(1)
+
+    bugs = find_bugs(args.benchmark_dir, args.bugs)
+    if not bugs:
+        print("error: no bugs to debug")
+        sys.exit(1)
+
+    logger = setup_logger("DebugPilot")
+    set_concurrency_limit(args.llm_concurrency)
+    os.makedirs(args.result_dir, exist_ok=True)
+    output = args.output or os.path.join(args.result_dir, "batch_results")
+
+    logger.info(f"Batch: {len(bugs)} bugs, {args.jobs} jobs, {args.llm_concurrency} concurrent LLM calls")
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {executor.submit(run_bug, project_id, bug_id, args): f"{project_id}_{bug_id}"
+                   for project_id, bug_id in bugs}
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            logger.info(f"[{len(rows)}/{len(bugs)}] {row['bug']}: {row['status']}, "
+                        f"root cause {row['root_cause'] or 0}, {row['wall_s']}s")
+
+    order = {f"{project_id}_{bug_id}": i for i, (project_id, bug_id) in enumerate(bugs)}
+    rows.sort(key=lambda row: order[row["bug"]])
+    print(write_table(rows, output))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-# core/__init__.py
-
-from .debug_engine import DebugEngine
-
-__all__ = [
-    'DebugEngine'
-]
+# core/__init__.py
+
+from .debug_engine import DebugEngine
+
+__all__ = [
+    'DebugEngine'
+]
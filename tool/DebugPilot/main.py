@@ -1,160 +1,189 @@
-import sys
-import os
-import json
-import argparse
-from datetime import datetime
-from typing import Dict, List, Any, Optional
-
-from core.debug_engine import DebugEngine
-from utils.logger import setup_logger
-
-
-class RecursiveDebugger:
-    def __init__(self, project_id: str, bug_id: str):
-        self.project_id = project_id
-        self.bug_id = bug_id
-        self.logger = setup_logger("DebugPilot")
-        
-        self.debug_engine = DebugEngine({"project_id": project_id, "bug_id": bug_id})
-
-        self.session_id = self._generate_session_id()
-        self.debug_data = {}
-    
-    def _generate_session_id(self) -> str:
-        return f"debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
-    def initialize(self) -> bool:
-        try:
-            self.logger.info(f"Initialization: PROJECT_ID={self.project_id}, BUG_ID={self.bug_id}, session={self.session_id}")
-            
-            # 读入data数据
-            data_dir = os.path.join("benchmark", f"{self.project_id}_{self.bug_id}")
-            
-            if not os.path.exists(data_dir):
-                self.logger.error(f"Data directory not found: {data_dir}")
-                return False
-            
-            # 读取四个JSON文件
-            try:
-                with open(os.path.join(data_dir, "call_info.json"), 'r', encoding='utf-8') as f:
-                    call_info = json.load(f)
-                
-                with open(os.path.join(data_dir, "code_info.json"), 'r', encoding='utf-8') as f:
-                    code_info = json.load(f)
-                
-                with open(os.path.join(data_dir, "start_info.json"), 'r', encoding='utf-8') as f:
-                    start_info = json.load(f)
-                
-                # with open(os.path.join(data_dir, "complete_trace.json"), 'r', encoding='utf-8') as f:
-                #     complete_trace = json.load(f)
-
-                with open(os.path.join(data_dir, "original.json"), 'r', encoding='utf-8') as f:
-                    original = json.load(f)
-
-                with open(os.path.join(data_dir, "trace_fix.json"), 'r', encoding='utf-8') as f:
-                    trace_fix = json.load(f)
-                
-                # 将数据存储到debug_data中
-                self.debug_data = {
-                    "call_info": call_info,
-                    "code_info": code_info,
-                    "start_info": start_info,
-                    # "complete_trace": complete_trace,
-                    "original": original,
-                    "trace_fix": trace_fix
-                }
-                
-                self.logger.info(f"Successfully loaded data files from {data_dir}")
-                self.logger.info(f"Call info entries: {len(call_info)}")
-                self.logger.info(f"Code info methods: {len(code_info)}")
-                # self.logger.info(f"Complete trace entries: {len(complete_trace)}")
-                self.logger.info(f"Original entries: {len(original)}")
-                self.logger.info(f"Trace Fix: {len(trace_fix)}")
-                self.logger.info(f"Test unit: {start_info.get('test_unit', 'N/A')}")
-                
-            except FileNotFoundError as e:
-                self.logger.error(f"Required data file not found: {e}")
-                return False
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Invalid JSON format in data file: {e}")
-                return False
-
-            self.logger.info("Initialization complete")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Initialization failed: {str(e)}")
-            return False
-    
-    def recursive_debug(self, debug_state=None, selected=None) -> Dict[str, Any]:
-        try:
-            self.logger.info("Start Debugging...")
-            
-            debug_result = self.debug_engine.start_debugging(
-                debug_data=self.debug_data,
-                debug_state=debug_state,
-                selected=selected
-            )
-            
-            return debug_result
-            
-        except Exception as e:
-            self.logger.error(f"Debugging failed: {str(e)}")
-            return {"status": "error", "message": str(e)}
-    
-    def run(self, debug_state, selected=None) -> Dict[str, Any]:
-        try:
-            if not self.initialize():
-                return {"status": "error", "message": "Initialization failed"}
-            
-            debug_result = self.recursive_debug(debug_state, selected)
-            return debug_result
-            
-        except Exception as e:
-            self.logger.error(f"Error: {str(e)}")
-            return {"status": "error", "message": str(e)}
-
-
-def main():
-    parser = argparse.ArgumentParser(description='DebugPilot - Recursive Debugging Tool')
-    parser.add_argument('project_id', help='Project identifier')
-    parser.add_argument('bug_id', help='Bug identifier')
-    parser.add_argument('reliable_state', nargs='?', help='Reliable state (4 integers separated by commas, e.g., "1,1,1,1")')
-    parser.add_argument('-s', '--selected', type=int, default=None, help='Selected parameter (default: -1)')
-    
-    args = parser.parse_args()
-    
-    project_id = args.project_id
-    bug_id = args.bug_id
-    selected = args.selected
-    
-    # 解析 reliable_state 参数
-    reliable_state = None
-    if args.reliable_state:
-        try:
-            # 将字符串按逗号分割并转换为整数数组
-            state_parts = args.reliable_state.split(',')
-            if len(state_parts) != 4:
-                print("Error: reliable_state must contain exactly 4 integers separated by commas")
-                print("Example: '1,1,1,1'")
-                sys.exit(1)
-            
-            reliable_state = [int(part.strip()) for part in state_parts]
-            print(f"Using reliable_state: {reliable_state}")
-            
-        except ValueError as e:
-            print(f"Error: Invalid reliable_state format. All values must be integers: {e}")
-            print("Example: '1,1,1,1'")
-            sys.exit(1)
-    
-    # 增加一个可选的参数-s --selected, type为int，默认为-1
-    # 这个参数将被传递至debug_engine.start_debugging
-
-    debugger = RecursiveDebugger(project_id, bug_id)
-    result = debugger.run(reliable_state, selected)
-    
-    print(json.dumps(result, ensure_ascii=False, indent=2))
-
-
-if __name__ == "__main__":
-    main()
+import sys
+import os
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from core.debug_engine import DebugEngine
+from utils.llm_replay import parse_latency
+from utils.logger import setup_logger
+from utils.metadata import get_metadata
+from utils.trace_store import open_trace
+
+
+class RecursiveDebugger:
+    def __init__(self, project_id: str, bug_id: str, trace_backend: str = "sqlite", use_cache: bool = True,
+                 benchmark_dir: str = "benchmark", result_dir: str = "result", **engine_options):
+        self.project_id = project_id
+        self.bug_id = bug_id
+        self.trace_backend = trace_backend
+        self.benchmark_dir = benchmark_dir
+        self.logger = setup_logger("DebugPilot")
+        
+        # engine_options: further DebugEngine config, e.g. llm_mode / cassette / replay_latency
+        self.debug_engine = DebugEngine(dict(engine_options, project_id=project_id, bug_id=bug_id,
+                                             use_cache=use_cache, result_dir=result_dir))
+
+        self.session_id = self._generate_session_id()
+        self.debug_data = {}
+    
+    def _generate_session_id(self) -> str:
+        return f"debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    def initialize(self) -> bool:
+        try:
+            self.logger.info(f"Initialization: PROJECT_ID={self.project_id}, BUG_ID={self.bug_id}, session={self.session_id}")
+            
+            # 读入data数据
+            data_dir = os.path.join(self.benchmark_dir, f"{self.project_id}_{self.bug_id}")
+            
+            if not os.path.exists(data_dir):
+                self.logger.error(f"Data directory not found: {data_dir}")
+                return False
+            
+            # 读取四个JSON文件
+            try:
+                # shared with the other sessions and the plan builder of this process
+                metadata = get_metadata(data_dir)
+                call_info = metadata.call_info
+                code_info = metadata.code_info
+                
+                with open(os.path.join(data_dir, "start_info.json"), 'r', encoding='utf-8') as f:
+                    start_info = json.load(f)
+                
+                # with open(os.path.join(data_dir, "complete_trace.json"), 'r', encoding='utf-8') as f:
+                #     complete_trace = json.load(f)
+
+                # original.json is converted once into an indexed store, steps are read on demand
+                original = open_trace(data_dir, self.trace_backend)
+
+                with open(os.path.join(data_dir, "trace_fix.json"), 'r', encoding='utf-8') as f:
+                    trace_fix = json.load(f)
+                
+                # 将数据存储到debug_data中
+                self.debug_data = {
+                    "call_info": call_info,
+                    "code_info": code_info,
+                    "start_info": start_info,
+                    # "complete_trace": complete_trace,
+                    "original": original,
+                    "trace_fix": trace_fix
+                }
+                
+                self.logger.info(f"Successfully loaded data files from {data_dir}")
+                self.logger.info(f"Call info entries: {len(call_info)}")
+                self.logger.info(f"Code info methods: {len(code_info)}")
+                # self.logger.info(f"Complete trace entries: {len(complete_trace)}")
+                self.logger.info(f"Original entries: {len(original)}")
+                self.logger.info(f"Trace Fix: {len(trace_fix)}")
+                self.logger.info(f"Test unit: {start_info.get('test_unit', 'N/A')}")
+                
+            except FileNotFoundError as e:
+                self.logger.error(f"Required data file not found: {e}")
+                return False
+            except json.JSONDecodeError as e:
+                self.logger.error(f"Invalid JSON format in data file: {e}")
+                return False
+
+            self.logger.info("Initialization complete")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Initialization failed: {str(e)}")
+            return False
+    
+    def recursive_debug(self, debug_state=None, selected=None, fresh=False) -> Dict[str, Any]:
+        try:
+            self.logger.info("Start Debugging...")
+            
+            debug_result = self.debug_engine.start_debugging(
+                debug_data=self.debug_data,
+                debug_state=debug_state,
+                selected=selected,
+                fresh=fresh
+            )
+            
+            return debug_result
+            
+        except Exception as e:
+            self.logger.error(f"Debugging failed: {str(e)}")
+            return {"status": "error", "message": str(e)}
+    
+    def run(self, debug_state, selected=None, fresh=False) -> Dict[str, Any]:
+        try:
+            if not self.initialize():
+                return {"status": "error", "message": "Initialization failed"}
+            
+            debug_result = self.recursive_debug(debug_state, selected, fresh)
+            return debug_result
+            
+        except Exception as e:
+            self.logger.error(f"Error: {str(e)}")
+            return {"status": "error", "message": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DebugPilot - Recursive Debugging Tool')
+    parser.add_argument('project_id', help='Project identifier')
+    parser.add_argument('bug_id', help='Bug identifier')
+    parser.add_argument('reliable_state', nargs='?', help='Reliable state (4 integers separated by commas, e.g., "1,1,1,1")')
+    parser.add_argument('-s', '--selected', type=int, default=None, help='Selected parameter (default: -1)')
+    parser.add_argument('--trace-backend', choices=['sqlite', 'binary', 'json'], default='sqlite', help='Storage of original.json (default: sqlite)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    parser.add_argument('--fresh', action='store_true', help='Ask the agent of the first step anew instead of the response cache (reruns after a reject or selection fix)')
+    parser.add_argument('--benchmark-dir', default='benchmark', help='Directory holding <project>_<bug> data (default: benchmark)')
+    parser.add_argument('--result-dir', default='result', help='Directory for <project>_<bug> states (default: result)')
+    parser.add_argument('--llm-mode', choices=['live', 'record', 'replay'], default='live', help='live: call the API, record: also save every call to the cassette, replay: answer from the cassette only (default: live)')
+    parser.add_argument('--cassette', default=None, help='Cassette file for record/replay (default: <result-dir>/<project>_<bug>/cassette.jsonl)')
+    parser.add_argument('--replay-latency', type=parse_latency, default='recorded', help='Simulated latency per replayed call: "recorded" or seconds (default: recorded)')
+    parser.add_argument('--accurate-dependency', action='store_true', help='Find the reader of each block output in the def-use index instead of the precomputed reverse field')
+    parser.add_argument('--speculate', type=int, default=1, metavar='K', help='Rank the blocks and evaluate the K most suspicious ones concurrently, the first inconsistent one is kept (default: 1, off)')
+    parser.add_argument('--context-budget', type=int, default=2048, help='Tokens of debugging context shown to an agent, older analyses are condensed or dropped beyond it; 0 shows all (default: 2048)')
+    parser.add_argument('--value-budget', type=int, default=4096, help='Tokens of block input / output values shown to Prediction and Comparison, long values, collections and nested calls are elided beyond it; 0 shows all (default: 4096)')
+    parser.add_argument('--no-local-comparison', action='store_true', help='Leave every oracle item to Agent Comparison instead of deciding literal values locally')
+    parser.add_argument('--exact-usage', action='store_true', help='Read every streamed answer on past </format> for the token usage the provider reports, cached tokens included, instead of counting tokens locally')
+    
+    args = parser.parse_args()
+    
+    project_id = args.project_id
+    bug_id = args.bug_id
+    selected = args.selected
+    
+    # 解析 reliable_state 参数
+    reliable_state = None
+    if args.reliable_state:
+        try:
+            # 将字符串按逗号分割并转换为整数数组
+            state_parts = args.reliable_state.split(',')
+            if len(state_parts) != 4:
+                print("Error: reliable_state must contain exactly 4 integers separated by commas")
+                print("Example: '1,1,1,1'")
+                sys.exit(1)
+            
+            reliable_state = [int(part.strip()) for part in state_parts]
+            print(f"Using reliable_state: {reliable_state}")
+            
+        except ValueError as e:
+            print(f"Error: Invalid reliable_state format. All values must be integers: {e}")
+            print("Example: '1,1,1,1'")
+            sys.exit(1)
+    
+    # 增加一个可选的参数-s --selected, type为int，默认为-1
+    # 这个参数将被传递至debug_engine.start_debugging
+
+    debugger = RecursiveDebugger(project_id, bug_id, args.trace_backend, use_cache=not args.no_cache,
+                                 benchmark_dir=args.benchmark_dir, result_dir=args.result_dir,
+                                 llm_mode=args.llm_mode, cassette=args.cassette, replay_latency=args.replay_latency,
+                                 accurate_dependency=args.accurate_dependency, speculative_k=args.speculate,
+                                 context_budget=args.context_budget,
+                                 value_budget=args.value_budget,
+                                 local_comparison=not args.no_local_comparison,
+                                 exact_usage=args.exact_usage)
+    result = debugger.run(reliable_state, selected, args.fresh)
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import glob
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Any
+
+from utils.profiler import PHASES, phase_of
+
+
+def find_span_files(paths: List[str], result_dir: str) -> List[str]:
+    if not paths:
+        return sorted(glob.glob(os.path.join(result_dir, "*", "spans.jsonl")))
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            direct = os.path.join(path, "spans.jsonl")
+            files += [direct] if os.path.exists(direct) else sorted(glob.glob(os.path.join(path, "*", "spans.jsonl")))
+        else:
+            files.append(path)
+    return files
+
+
+def load_spans(files: List[str], last_run: bool = False) -> List[Dict[str, Any]]:
+    spans = []
+    for path in files:
+        file_spans = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        file_spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        if last_run and file_spans:
+            # runs are named by start time
+            last = max(span.get("run") or "" for span in file_spans)
+            file_spans = [span for span in file_spans if (span.get("run") or "") == last]
+        spans += file_spans
+    return spans
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def phase_table(spans: List[Dict[str, Any]]) -> List[List[Any]]:
+    by_name = defaultdict(list)
+    for span in spans:
+        by_name[span["name"]].append(span)
+
+    rows = []
+    for name, group in by_name.items():
+        durations = [span["duration"] for span in group]
+        rows.append([
+            name, len(group),
+            round(sum(durations), 3),
+            round(1000 * sum(durations) / len(durations), 2),
+            round(1000 * percentile(durations, 0.5), 2),
+            round(1000 * percentile(durations, 0.95), 2),
+            round(1000 * max(durations), 2),
+            sum(span.get("prompt_tokens", 0) for span in group),
+            sum(span.get("cached_tokens", 0) for span in group),
+            sum(span.get("completion_tokens", 0) for span in group),
+            sum(span.get("retries", 0) for span in group)
+        ])
+    rows.sort(key=lambda row: -row[2])
+    return rows
+
+
+def bug_table(spans: List[Dict[str, Any]]) -> List[List[Any]]:
+    by_bug = defaultdict(list)
+    for span in spans:
+        by_bug[span.get("bug", "")].append(span)
+
+    rows = []
+    for bug in sorted(by_bug):
+        group = by_bug[bug]
+        totals = defaultdict(float)
+        for span in group:
+            phase = phase_of(span["name"])
+            if phase is not None:
+                totals[phase] += span["duration"]
+        llm = [span for span in group if span["name"] == "llm"]
+        rows.append(
+            [bug, len({span.get("run") for span in group})] +
+            [round(totals[phase], 3) for phase in PHASES] +
+            [len(llm),
+             sum(span.get("prompt_tokens", 0) for span in llm),
+             sum(span.get("cached_tokens", 0) for span in llm),
+             sum(span.get("completion_tokens", 0) for span in llm),
+             sum(span.get("retries", 0) for span in llm)]
+        )
+    return rows
+
+
+def print_table(header: List[str], rows: List[List[Any]]):
+    widths = [max(len(str(cell)) for cell in [h] + [row[i] for row in rows]) for i, h in enumerate(header)]
+    print("  ".join(f"{h:>{w}}" for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(f"{str(cell):>{w}}" for cell, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate the timing spans written by DebugEngine (spans.jsonl)')
+    parser.add_argument('paths', nargs='*', help='spans.jsonl files or result directories (default: <result-dir>/*/spans.jsonl)')
+    parser.add_argument('--result-dir', default='result', help='Result root searched when no path is given (default: result)')
+    parser.add_argument('--last', action='store_true', help='Only the last run of every bug')
+    parser.add_argument('--json', action='store_true', help='Print both tables as json')
+
+    args = parser.parse_args()
+
+    spans = load_spans(find_span_files(args.paths, args.result_dir), args.last)
+    if not spans:
+        print("error: no spans found")
+        sys.exit(1)
+
+    phase_header = ["span", "count", "total_s", "mean_ms", "p50_ms", "p95_ms", "max_ms",
+                    "prompt_tok", "cached_tok", "completion_tok", "retries"]
+    bug_header = ["bug", "runs"] + [f"{phase}_s" for phase in PHASES] + \
+                 ["llm_calls", "prompt_tok", "cached_tok", "completion_tok", "retries"]
+    phases = phase_table(spans)
+    bugs = bug_table(spans)
+
+    if args.json:
+        print(json.dumps({
+            "phases": [dict(zip(phase_header, row)) for row in phases],
+            "bugs": [dict(zip(bug_header, row)) for row in bugs]
+        }, indent=2))
+        return
+
+    print("Per phase (agent spans include their llm and parse spans):")
+    print_table(phase_header, phases)
+    print()
+    print("Per bug:")
+    print_table(bug_header, bugs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import hmac
+import json
+import os
+import re
+import argparse
+import secrets
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, Tuple
+
+from interaction import CommandError, DEFAULT_DAEMON, TOKEN_FILE, prepare_command
+from main import RecursiveDebugger
+from summary import summarize
+from utils.logger import setup_logger
+
+# project and bug ids become paths (benchmark/<project>_<bug>, result/<project>_<bug>)
+_ID = re.compile(r'[A-Za-z0-9_-]+')
+
+
+def write_token(path: str) -> str:
+    # a fresh random token in a file only the current user can read
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    token = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    os.chmod(path, 0o600)
+    return token
+
+
+class DebugSession:
+    """A RecursiveDebugger kept resident for one (project_id, bug_id): data files and trace are loaded once"""
+
+    def __init__(self, project_id: str, bug_id: str, trace_backend: str = "sqlite", use_cache: bool = True):
+        self.project_id = project_id
+        self.bug_id = bug_id
+        self.debugger = RecursiveDebugger(project_id, bug_id, trace_backend, use_cache=use_cache)
+        self.initialized = False
+        # commands of one bug edit the same states, run them one at a time
+        self.lock = threading.Lock()
+
+    def handle(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            if not self.initialized:
+                if not self.debugger.initialize():
+                    return {"status": "error", "message": "Initialization failed"}
+                self.initialized = True
+
+            engine = self.debugger.debug_engine
+            # templates edited since the last command
+            engine.prompts.refresh()
+            try:
+                plan = prepare_command(user_data, engine.state_store)
+            except (CommandError, KeyError, TypeError) as e:
+                return {"status": "error", "message": f"Invalid command: {e}"}
+
+            if "reply" in plan:
+                return {"status": "success" if plan["ok"] else "error", "reply": plan["reply"]}
+
+            results = []
+            for reliable_state, selected, fresh in plan["runs"]:
+                debug_state = [int(part) for part in reliable_state.split(',')] if reliable_state else None
+                results.append(self.debugger.recursive_debug(debug_state, selected, fresh))
+
+            if plan["summary"]:
+                # as with the summary subprocess, a failed summary does not fail the command
+                try:
+                    summarize(self.project_id, self.bug_id, store=engine.state_store)
+                except Exception as e:
+                    self.debugger.logger.warning(f"Summary failed: {str(e)}")
+
+            return {"status": "success", "results": results}
+
+    def close(self):
+        original = self.debugger.debug_data.get("original")
+        if hasattr(original, "close"):
+            original.close()
+        self.debugger.debug_engine.state_store.close()
+
+
+class DebugServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], token: str, trace_backend: str = "sqlite", use_cache: bool = True):
+        super().__init__(address, DebugRequestHandler)
+        self.token = token
+        self.trace_backend = trace_backend
+        self.use_cache = use_cache
+        self.logger = setup_logger("DebugPilot")
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def session(self, project_id: str, bug_id: str) -> DebugSession:
+        key = (project_id, bug_id)
+        with self._sessions_lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = DebugSession(project_id, bug_id, self.trace_backend, self.use_cache)
+                self.sessions[key] = session
+        return session
+
+    def session_ids(self):
+        with self._sessions_lock:
+            return list(self.sessions)
+
+    def drop(self, project_id: str, bug_id: str) -> bool:
+        with self._sessions_lock:
+            session = self.sessions.pop((project_id, bug_id), None)
+        if session is None:
+            return False
+        with session.lock:
+            session.close()
+        return True
+
+
+class DebugRequestHandler(BaseHTTPRequestHandler):
+    # POST /command {"project_id", "bug_id", "payload": <user_driven.json>}
+    # POST /close {"project_id", "bug_id"}, POST /shutdown, GET /sessions
+    # every request carries "Authorization: Bearer <token>", the token of the server's token file
+
+    def _send(self, code: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+    def _authorized(self) -> bool:
+        header = self.headers.get("Authorization", "")
+        if header.startswith("Bearer ") and hmac.compare_digest(header[len("Bearer "):].strip(), self.server.token):
+            return True
+        self._send(401, {"status": "error", "message": "Missing or wrong token"})
+        return False
+
+    def _ids(self, body: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        project_id, bug_id = str(body["project_id"]), str(body["bug_id"])
+        if not _ID.fullmatch(project_id) or not _ID.fullmatch(bug_id):
+            self._send(400, {"status": "error", "message": f"Invalid project or bug id: {project_id}_{bug_id}"})
+            return None
+        return project_id, bug_id
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/sessions":
+            sessions = [{"project_id": p, "bug_id": b} for p, b in self.server.session_ids()]
+            self._send(200, {"status": "success", "sessions": sessions})
+        else:
+            self._send(404, {"status": "error", "message": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            body = self._read_json()
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send(400, {"status": "error", "message": f"Invalid JSON: {e}"})
+            return
+
+        if self.path == "/command":
+            try:
+                ids = self._ids(body)
+                payload = body["payload"]
+                payload["command"]
+            except (KeyError, TypeError) as e:
+                self._send(400, {"status": "error", "message": f"Missing field: {e}"})
+                return
+            if ids is None:
+                return
+            project_id, bug_id = ids
+
+            self.server.logger.info(f"Command {payload['command']} for {project_id}_{bug_id}")
+            try:
+                result = self.server.session(project_id, bug_id).handle(payload)
+            except Exception as e:
+                self.server.logger.error(f"Command failed: {str(e)}")
+                self._send(500, {"status": "error", "message": str(e)})
+                return
+            self._send(200 if result["status"] == "success" else 400, result)
+
+        elif self.path == "/close":
+            try:
+                ids = self._ids(body)
+            except (KeyError, TypeError) as e:
+                self._send(400, {"status": "error", "message": f"Missing field: {e}"})
+                return
+            if ids is None:
+                return
+            self._send(200, {"status": "success", "closed": self.server.drop(*ids)})
+
+        elif self.path == "/shutdown":
+            self._send(200, {"status": "success"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+        else:
+            self._send(404, {"status": "error", "message": f"Unknown path: {self.path}"})
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(f"{self.address_string()} {format % args}")
+
+
+def main():
+    host, port = DEFAULT_DAEMON.rsplit(":", 1)
+    parser = argparse.ArgumentParser(description='DebugPilot daemon - keeps debugging sessions loaded between commands')
+    parser.add_argument('--host', default=host, help=f'Listen address (default: {host})')
+    parser.add_argument('--port', type=int, default=int(port), help=f'Listen port (default: {port})')
+    parser.add_argument('--trace-backend', choices=['sqlite', 'binary', 'json'], default='sqlite', help='Storage of original.json (default: sqlite)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    parser.add_argument('--token-file', default=TOKEN_FILE, help=f'File the request token is written to, readable by the owner only (default: {TOKEN_FILE}, or DEBUGPILOT_TOKEN_FILE)')
+
+    args = parser.parse_args()
+
+    server = DebugServer((args.host, args.port), write_token(args.token_file), args.trace_backend, use_cache=not args.no_cache)
+    server.logger.info(f"DebugPilot daemon listening on {args.host}:{args.port}, token in {args.token_file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for project_id, bug_id in server.session_ids():
+            server.drop(project_id, bug_id)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+# the modules import each other as top-level packages (utils, core), as when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    # loggers create logs/ in the working directory
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,126 @@
+import pytest
+
+from utils.comparator import APPROXIMATE, EXACT, STRUCTURAL, LocalComparator, compare_value
+
+
+def verdict(actual, expected, type_):
+    result = compare_value(actual, expected, type_)
+    return None if result is None else result[0]
+
+
+@pytest.mark.parametrize("actual, expected, consistent", [
+    ("65", "A", 1),
+    ("65", "'A'", 1),
+    ("65", "\"A\"", 1),
+    ("65", "65", 1),
+    ("66", "A", 0),
+    ("48", "'0'", 1),
+    # a bare digit is the character or its code, left to Agent Comparison
+    ("49", "1", None),
+    ("abc", "A", None),
+])
+def test_char_codes(actual, expected, consistent):
+    assert verdict(actual, expected, "char") == consistent
+
+
+@pytest.mark.parametrize("actual, expected, consistent", [
+    ("1", "true", 1),
+    ("0", "false", 1),
+    ("1", "false", 0),
+    ("0", "True", 0),
+    ("true", "1", 1),
+    ("1", "yes", None),
+])
+def test_booleans_as_one_and_zero(actual, expected, consistent):
+    assert verdict(actual, expected, "boolean") == consistent
+
+
+@pytest.mark.parametrize("actual, expected, consistent", [
+    ("abc", "\"abc\"", 1),
+    ("abc", "'abc'", 1),
+    ("abc", "\\\"abc\\\"", 1),
+    ("abc", "\"abd\"", 0),
+    ("a b", "\\\"a b\\\"", 1),
+    # unquoted text may describe the value instead of stating it
+    ("abc", "the trimmed input", None),
+])
+def test_quoted_and_escaped_strings(actual, expected, consistent):
+    assert verdict(actual, expected, "String") == consistent
+
+
+@pytest.mark.parametrize("actual, expected, type_, consistent", [
+    ("null", "null", "String", 1),
+    ("abc", "null", "String", 0),
+    ("null", "null", "Object", 1),
+    ("0x1f", "null", "Object", None),
+])
+def test_null(actual, expected, type_, consistent):
+    assert verdict(actual, expected, type_) == consistent
+
+
+def test_float_tolerance():
+    assert compare_value("0.1", "0.1000000000001", "double") == (1, APPROXIMATE)
+    assert compare_value("3", "3.0", "double") == (1, EXACT)
+    assert compare_value("5", "5L", "long") == (1, EXACT)
+    assert compare_value("NaN", "NaN", "double") == (1, EXACT)
+    assert verdict("0.1", "0.2", "double") == 0
+    assert verdict("0.1", "0.10001", "float") == 0
+    # integers are compared exactly
+    assert verdict("3", "4", "int") == 0
+
+
+def test_collections():
+    assert compare_value("[1, 2]", "[1,2]", "int[]") == (1, STRUCTURAL)
+    assert verdict("[1,2]", "[1,3]", "List") == 0
+    assert verdict("[1,2]", "[1,2,3]", "List") == 0
+    assert verdict("{\"a\": 1}", "{\"a\": 1.0}", "Map") == 1
+    assert verdict("[1,2]", "two elements", "List") is None
+
+
+OUTVARS = [
+    {"name": "this.x", "type": "int", "value": "1"},
+    {"name": "other.x", "type": "int", "value": "2"},
+    {"name": "this.y", "type": "int", "value": "7"},
+    {"name": "arr", "type": "int[]", "value": "0x1f", "elements": ["1", "2"], "element_type": "int"},
+    {"name": "flags", "type": "boolean[]", "value": "0x2a", "elements": ["1", "0"], "element_type": "boolean"},
+    {"name": "done", "type": "boolean", "value": "1"},
+]
+
+
+def oracle(name, expected):
+    return {"name": name, "analysis": "", "expected": expected}
+
+
+def test_check_arrays_through_elements():
+    comparator = LocalComparator()
+    assert comparator.check(oracle("arr", "[1, 2]"), OUTVARS)["consistent"] == 1
+    assert comparator.check(oracle("arr", "[1, 3]"), OUTVARS)["consistent"] == 0
+    assert comparator.check(oracle("flags", "[true, false]"), OUTVARS)["consistent"] == 1
+    assert comparator.check(oracle("arr", "[1, 2]"), OUTVARS)["actual"] == "[1, 2]"
+
+
+def test_check_dotted_suffix_names():
+    comparator = LocalComparator()
+    # "x" ends two outputs with different values: ambiguous, left to Agent Comparison
+    assert LocalComparator.find("x", OUTVARS) is None
+    assert comparator.check(oracle("x", "1"), OUTVARS) is None
+    assert LocalComparator.find("this.x", OUTVARS)["value"] == "1"
+    assert comparator.check(oracle("y", "7"), OUTVARS)["consistent"] == 1
+    assert comparator.check(oracle("this.done", "true"), OUTVARS)["consistent"] == 1
+    # outputs with the same value are not ambiguous
+    same = [{"name": "this.x", "type": "int", "value": "1"}, {"name": "that.x", "type": "int", "value": "1"}]
+    assert comparator.check(oracle("x", "1"), same)["consistent"] == 1
+
+
+def test_check_leaves_missing_and_no_value_open():
+    comparator = LocalComparator()
+    assert comparator.check(oracle("missing", "1"), OUTVARS) is None
+    assert comparator.check(oracle("done", "No value"), OUTVARS) is None
+
+
+def test_compare_counts_decided_items():
+    comparator = LocalComparator()
+    verdicts = comparator.compare([oracle("done", "true"), oracle("x", "1")], OUTVARS)
+    assert verdicts[0]["consistent"] == 1 and verdicts[1] is None
+    comparator.compare([oracle("done", "false")], OUTVARS)
+    assert comparator.report() == {"comparisons": 2, "skipped": 1, "entries": 3, "decided": 2}
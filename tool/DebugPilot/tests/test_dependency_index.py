@@ -0,0 +1,106 @@
+import json
+import random
+
+import pytest
+
+from utils.io import IOExtractor
+from utils.trace_index import DependencyIndex, dependency_keys, iter_dependencies
+from utils.trace_store import open_trace
+
+STEPS = 40
+IDS = ["a", "b", "c", None]
+ALIASES = ["-1", "7", "8", None]
+
+
+def synthetic_trace(seed=0):
+    rng = random.Random(seed)
+    trace = []
+    for trace_id in range(1, STEPS + 1):
+        inputs = [{"type": "int", "name": f"v{n}", "value": "0", "depth": 0,
+                   "id": rng.choice(IDS), "alias_id": rng.choice(ALIASES),
+                   "depend": rng.choice([-1] + list(range(1, trace_id)))}
+                  for n in range(rng.randint(0, 3))]
+        trace.append({"trace_id": trace_id, "depth": 0, "line": trace_id, "son": -1, "sip": trace_id - 1,
+                      "parent": -1, "input": inputs, "output": []})
+    return trace
+
+
+def reads(step, current, write_var):
+    for input_var in step.get("input", []):
+        if input_var.get("depend") != current:
+            continue
+        if input_var.get("id") is not None and input_var.get("id") == write_var.get("id"):
+            return True
+        alias_id = input_var.get("alias_id")
+        if alias_id is not None and alias_id == write_var.get("alias_id") and alias_id != "-1":
+            return True
+    return False
+
+
+def linear_next(data, producer, write_var, after, before=None):
+    # the scan get_data_dependency_reverse made before the def-use index, over (after, before)
+    for i in range(after + 1, (len(data) + 1) if before is None else before):
+        if reads(data[i - 1], producer, write_var):
+            return i
+    return None
+
+
+def linear_reverse(data, current, write_var, end_id):
+    for after, before in ((end_id, None), (current, end_id)):
+        consumer = linear_next(data, current, write_var, after, before)
+        if consumer is not None:
+            return consumer
+    return -1
+
+
+WRITE_VARS = [{"id": id_, "alias_id": alias_id} for id_ in IDS for alias_id in ALIASES]
+
+
+def test_next_consumer_matches_linear_scan():
+    trace = synthetic_trace()
+    index = DependencyIndex.build(iter_dependencies(trace), len(trace))
+    for producer in range(1, STEPS + 1):
+        for write_var in WRITE_VARS:
+            keys = dependency_keys(write_var)
+            for after in range(0, STEPS + 1):
+                for before in [None] + list(range(after + 1, STEPS + 2)):
+                    expected = linear_next(trace, producer, write_var, after, before)
+                    found = index.next_consumer(producer, keys, after, before) if keys else None
+                    assert found == expected, (producer, write_var, after, before)
+
+
+def test_alias_minus_one_is_no_key():
+    assert dependency_keys({"id": None, "alias_id": "-1"}) == []
+    assert len(dependency_keys({"id": "a", "alias_id": "-1"})) == 1
+    assert len(dependency_keys({"id": "a", "alias_id": "7"})) == 2
+
+
+def test_next_consumer_before_is_exclusive():
+    trace = [{"input": []}, {"input": [{"id": "a", "alias_id": "-1", "depend": 1}]},
+             {"input": [{"id": "x", "alias_id": "7", "depend": 1}]}]
+    index = DependencyIndex.build(iter_dependencies(trace), len(trace))
+    keys = dependency_keys({"id": "a", "alias_id": "7"})
+    assert index.next_consumer(1, keys, 0) == 2
+    assert index.next_consumer(1, keys, 0, before=2) is None
+    assert index.next_consumer(1, keys, 2) == 3
+    assert index.next_consumer(1, keys, 2, before=3) is None
+    # an alias_id of "-1" on both sides does not link the steps
+    assert index.next_consumer(1, dependency_keys({"id": "y", "alias_id": "-1"}), 0) is None
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "binary"])
+def test_data_dependency_reverse_matches_linear_scan(tmp_path, backend):
+    trace = synthetic_trace(seed=1)
+    with open(tmp_path / "original.json", "w", encoding="utf-8") as f:
+        json.dump(trace, f)
+    data = open_trace(str(tmp_path), backend)
+    extractor = IOExtractor()
+    try:
+        for current in range(1, STEPS + 1):
+            for end_id in range(current, STEPS + 1):
+                for write_var in WRITE_VARS:
+                    assert extractor.get_data_dependency_reverse(data, current, write_var, end_id) == \
+                        linear_reverse(trace, current, write_var, end_id), (current, end_id, write_var)
+    finally:
+        if hasattr(data, "close"):
+            data.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Unix only: without it the memory columns stay empty
+    resource = None
+
+from utils.trace_store import open_trace
+
+BACKENDS = ["json", "sqlite", "binary"]
+STORE_FILES = {"sqlite": "original.sqlite", "binary": "original.bin"}
+
+
+def max_rss_mb() -> Optional[float]:
+    # ru_maxrss is in KB on Linux
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(data_dir: str, backend: str, window: int) -> dict:
+    from utils.io import IOExtractor
+
+    with open(os.path.join(data_dir, "trace_fix.json"), 'r', encoding='utf-8') as f:
+        trace_fix = json.load(f)
+
+    rss_before = max_rss_mb()
+    begin = time.perf_counter()
+    trace = open_trace(data_dir, backend)
+    load_time = time.perf_counter() - begin
+    rss_loaded = max_rss_mb()
+
+    # extract io for consecutive windows in the middle of the trace
+    extractor = IOExtractor()
+    first = max(1, len(trace) // 2 - window)
+    begin = time.perf_counter()
+    for start in range(first, min(len(trace), first + 2 * window), window):
+        extractor.extract_io_data(trace, 0, start, min(len(trace) - 1, start + window - 1), trace_fix)
+    slice_time = time.perf_counter() - begin
+
+    return {
+        "backend": backend,
+        "steps": len(trace),
+        "load_s": round(load_time, 4),
+        "slice_s": round(slice_time, 4),
+        "rss_load_mb": round(rss_loaded - rss_before, 1) if resource is not None else None,
+        "rss_total_mb": round(max_rss_mb(), 1) if resource is not None else None
+    }
+
+
+def run_child(data_dir: str, backend: str, window: int, fresh: bool) -> dict:
+    if fresh and backend in STORE_FILES:
+        path = os.path.join(data_dir, STORE_FILES[backend])
+        if os.path.exists(path):
+            os.remove(path)
+
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", backend, data_dir, "--window", str(window)]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare load time and memory of the trace backends')
+    parser.add_argument('project_id', nargs='?', help='Project identifier')
+    parser.add_argument('bug_id', nargs='?', help='Bug identifier')
+    parser.add_argument('--window', type=int, default=200, help='Steps per extracted block (default: 200)')
+    parser.add_argument('--child', nargs=2, metavar=('BACKEND', 'DATA_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        backend, data_dir = args.child
+        print(json.dumps(measure(data_dir, backend, args.window)))
+        return
+
+    if not args.project_id or not args.bug_id:
+        parser.error("project_id and bug_id are required")
+
+    data_dir = os.path.join("benchmark", f"{args.project_id}_{args.bug_id}")
+    if not os.path.exists(os.path.join(data_dir, "original.json")):
+        print(f"error: {data_dir}/original.json not found")
+        sys.exit(1)
+
+    rows = []
+    for backend in BACKENDS:
+        if backend in STORE_FILES:
+            # first open converts, second open reuses the converted file
+            converted = run_child(data_dir, backend, args.window, fresh=True)
+            rows.append(dict(converted, backend=f"{backend} (convert)"))
+        rows.append(run_child(data_dir, backend, args.window, fresh=False))
+
+    header = ["backend", "steps", "load_s", "slice_s", "rss_load_mb", "rss_total_mb"]
+    print(" | ".join(f"{h:>18}" for h in header))
+    for row in rows:
+        print(" | ".join(f"{str(row[h]):>18}" for h in header))
+
+
+if __name__ == "__main__":
+    main()
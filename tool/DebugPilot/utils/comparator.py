@@ -0,0 +1,265 @@
+import json
+import math
+import re
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+# trace types with a literal value the oracle can be checked against without Agent Comparison
+INTEGER_TYPES = {"byte", "short", "int", "long", "Byte", "Short", "Integer", "Long", "BigInteger"}
+FLOAT_TYPES = {"float", "double", "Float", "Double", "BigDecimal", "Number"}
+BOOLEAN_TYPES = {"boolean", "Boolean"}
+CHAR_TYPES = {"char", "Character"}
+STRING_TYPES = {"String", "CharSequence", "StringBuilder", "StringBuffer"}
+COLLECTION_TYPES = {"List", "ArrayList", "LinkedList", "Set", "HashSet", "TreeSet", "LinkedHashSet",
+                    "Collection", "Map", "HashMap", "TreeMap", "LinkedHashMap"}
+
+_NUMBER = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?[lLfFdD]?')
+_SPECIAL_FLOATS = {"nan": math.nan, "infinity": math.inf, "+infinity": math.inf, "-infinity": -math.inf}
+_BOOLEANS = {"true": 1, "false": 0, "1": 1, "0": 0}
+
+# the reasons _parse_comparison already gave for an overruled Agent Comparison verdict
+EXACT = "Actual value matches expected"
+APPROXIMATE = "Actual value approximately matches expected"
+STRUCTURAL = "Actual value structurally matches expected"
+
+
+def _unquote(text: str) -> Tuple[str, bool]:
+    # a string literal of the oracle, its quotes may be escaped as it is written inside "expected": "..."
+    text = text.strip()
+    if len(text) >= 4 and text.startswith('\\"') and text.endswith('\\"'):
+        return text[2:-2], True
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1], True
+    return text, False
+
+
+def _number(text: str) -> Optional[float]:
+    text = text.strip()
+    if text.lower() in _SPECIAL_FLOATS:
+        return _SPECIAL_FLOATS[text.lower()]
+    if not _NUMBER.fullmatch(text):
+        return None
+    text = text.rstrip("lLfFdD")
+    try:
+        return int(text) if re.fullmatch(r'[+-]?\d+', text) else float(text)
+    except ValueError:
+        return None
+
+
+def _same_number(actual: float, expected: float) -> Tuple[bool, bool]:
+    # (equal, only within float tolerance)
+    if isinstance(actual, int) and isinstance(expected, int):
+        return actual == expected, False
+    if math.isnan(actual) or math.isnan(expected):
+        return math.isnan(actual) and math.isnan(expected), False
+    if actual == expected:
+        return True, False
+    return math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-10), True
+
+
+def _char_code(expected: str) -> Optional[int]:
+    # the trace writes a char as its code, the oracle as the character or the code; a bare digit could be either
+    inner, quoted = _unquote(expected)
+    if len(inner) == 1 and (quoted or not inner.isdigit()):
+        return ord(inner)
+    number = _number(inner) if len(inner) > 1 else None
+    return number if isinstance(number, int) else None
+
+
+def _same_json(actual: Any, expected: Any) -> Optional[bool]:
+    # structural equality, numbers within float tolerance; None when the kinds do not line up
+    if isinstance(actual, bool) or isinstance(expected, bool):
+        actual = int(actual) if isinstance(actual, bool) else actual
+        expected = int(expected) if isinstance(expected, bool) else expected
+    if isinstance(actual, (int, float)) and isinstance(expected, (int, float)):
+        return _same_number(actual, expected)[0]
+    if isinstance(actual, str) and isinstance(expected, str):
+        return actual == expected
+    if actual is None or expected is None:
+        return actual is expected
+    if isinstance(actual, list) and isinstance(expected, list):
+        if len(actual) != len(expected):
+            return False
+        verdicts = [_same_json(a, e) for a, e in zip(actual, expected)]
+        if False in verdicts:
+            return False
+        return None if None in verdicts else True
+    if isinstance(actual, dict) and isinstance(expected, dict):
+        if set(actual) != set(expected):
+            return False
+        return _same_json([actual[key] for key in sorted(actual)], [expected[key] for key in sorted(expected)])
+    return None
+
+
+def _json(text: str) -> Tuple[Any, bool]:
+    try:
+        return json.loads(text), True
+    except (ValueError, TypeError):
+        return None, False
+
+
+def compare_value(actual: str, expected: str, type_: Optional[str] = None) -> Optional[Tuple[int, str]]:
+    # (consistent, reason) of one output value against the oracle, None when it takes Agent Comparison to tell
+    actual = str(actual)
+    expected = str(expected)
+    expected_text, quoted = _unquote(expected)
+    differs = f"Actual output '{actual}' does not match oracle '{expected}'."
+    if type_ in CHAR_TYPES:
+        actual_code = _number(actual)
+        expected_code = _char_code(expected)
+        if not isinstance(actual_code, int) or expected_code is None:
+            return None
+        return (1, EXACT) if actual_code == expected_code else (0, differs)
+
+    if actual.strip() == expected.strip() or (quoted and actual == expected_text):
+        return 1, EXACT
+
+    if type_ in BOOLEAN_TYPES:
+        actual_bool = _BOOLEANS.get(actual.strip().lower())
+        expected_bool = _BOOLEANS.get(expected_text.lower())
+        if actual_bool is None or expected_bool is None:
+            return None
+        return (1, EXACT) if actual_bool == expected_bool else (0, differs)
+
+    if type_ in STRING_TYPES:
+        # only a quoted literal or null is an exact expectation, anything else may describe the value
+        if quoted:
+            return 0, differs
+        if expected_text == "null":
+            return 0, differs
+        return None
+
+    if type_ is None or type_ in INTEGER_TYPES or type_ in FLOAT_TYPES:
+        actual_number = _number(actual)
+        expected_number = _number(expected_text)
+        if actual_number is not None and expected_number is not None:
+            equal, approximate = _same_number(actual_number, expected_number)
+            if equal:
+                return 1, APPROXIMATE if approximate else EXACT
+            return 0, differs
+        if type_ is not None:
+            return None
+
+    if type_ is None or type_ in COLLECTION_TYPES or type_.endswith("[]"):
+        actual_json, actual_ok = _json(actual)
+        expected_json, expected_ok = _json(expected_text)
+        if actual_ok and expected_ok:
+            same = _same_json(actual_json, expected_json)
+            if same is not None:
+                return (1, STRUCTURAL) if same else (0, differs)
+    return None
+
+
+def _element(value: str, type_: str) -> Any:
+    # an array element as a JSON value
+    if value == "null":
+        return None
+    if type_ in BOOLEAN_TYPES and value.lower() in _BOOLEANS:
+        return bool(_BOOLEANS[value.lower()])
+    if type_ in INTEGER_TYPES or type_ in FLOAT_TYPES:
+        number = _number(value)
+        if number is not None:
+            return number
+    return value
+
+
+class LocalComparator:
+    """Checks the predicted oracle against the block outputs before Agent Comparison is asked
+
+    Each oracle entry is matched to a write variable of the block by name. Numbers, booleans, chars, quoted strings
+    and JSON-able collections are decided here; the other entries go to Agent Comparison, which is not called at
+    all when every entry is decided.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # comparisons, comparisons without Agent Comparison, oracle entries, oracle entries decided here
+        self._usage = [0, 0, 0, 0]
+
+    @staticmethod
+    def find(name: str, outvars: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # the output called name, or the only one its name ends with ("x" / "this.x"); None if missing or ambiguous
+        name = name.strip()
+        found = [var for var in outvars if var["name"] == name]
+        if not found:
+            found = [var for var in outvars
+                     if var["name"].endswith("." + name) or name.endswith("." + var["name"])]
+        if not found or any(var["value"] != found[0]["value"] for var in found[1:]):
+            return None
+        return found[0]
+
+    def check(self, oracle_item: Dict[str, Any], outvars: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # a match item as Agent Comparison writes it, None if undecided
+        expected = oracle_item.get("expected", "No value")
+        var = self.find(oracle_item.get("name", ""), outvars)
+        if var is None or expected == "No value":
+            return None
+        verdict = compare_value(var["value"], expected, var["type"])
+        actual = var["value"]
+        if verdict is None and "elements" in var:
+            # arrays print as an address, their elements are in the trace
+            actual = json.dumps([_element(value, var.get("element_type", "")) for value in var["elements"]])
+            verdict = compare_value(actual, expected, var["type"])
+        if verdict is None:
+            return None
+        consistent, reason = verdict
+        return {"name": oracle_item["name"], "actual": actual, "reason": reason, "consistent": consistent}
+
+    def compare(self, oracle: List[Dict[str, Any]], outvars: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        verdicts = [self.check(item, outvars) for item in oracle]
+        decided = sum(1 for verdict in verdicts if verdict is not None)
+        with self._lock:
+            for i, value in enumerate((1, int(decided == len(verdicts)), len(verdicts), decided)):
+                self._usage[i] += value
+        return verdicts
+
+    @staticmethod
+    def oracle_text(oracle: List[Dict[str, Any]], verdicts: List[Optional[Dict[str, Any]]]) -> str:
+        # the oracle shown to Agent Comparison: the open entries, then the checked ones with their verdicts
+        text = "\"oracle\":\n"
+        for item, verdict in zip(oracle, verdicts):
+            if verdict is None:
+                text += f"- \"name\": \"{item['name']}\", \"analysis\": \"{item['analysis']}\", \"expected\": \"{item['expected']}\"\n"
+        if any(verdict is not None for verdict in verdicts):
+            text += "\"checked\":\n"
+            for item, verdict in zip(oracle, verdicts):
+                if verdict is not None:
+                    text += (f"- \"name\": \"{item['name']}\", \"expected\": \"{item['expected']}\", "
+                             f"\"actual\": \"{verdict['actual']}\", \"consistent\": {verdict['consistent']}\n")
+        return text
+
+    @staticmethod
+    def merge(oracle: List[Dict[str, Any]], verdicts: List[Optional[Dict[str, Any]]],
+              match: Dict[str, Any]) -> Dict[str, Any]:
+        # checked entries first, then the ones of Agent Comparison that were not checked here
+        checked = [verdict for verdict in verdicts if verdict is not None]
+        names = {verdict["name"] for verdict in checked}
+        items = checked + [item for item in match["match"] if item["name"] not in names]
+        consistent_count = sum(1 for item in items if item["consistent"] == 1)
+        return {
+            "match": items,
+            "summary": match["summary"],
+            "consistent": consistent_count / len(items) if items else 0.0
+        }
+
+    @staticmethod
+    def local_match(oracle: List[Dict[str, Any]], verdicts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # every entry decided: the match and a summary in the form of Agent Comparison's
+        differing = [(item, verdict) for item, verdict in zip(oracle, verdicts) if verdict["consistent"] != 1]
+        if differing:
+            summary = " ".join(f"{verdict['name']} is {verdict['actual']} while the expected value is {item['expected']}: "
+                               f"{item['analysis']}" for item, verdict in differing)
+        else:
+            summary = "The block outputs match the prediction: " + ", ".join(
+                f"{verdict['name']} is {verdict['actual']}" for verdict in verdicts) + "."
+        consistent_count = len(verdicts) - len(differing)
+        return {
+            "match": verdicts,
+            "summary": summary,
+            "consistent": consistent_count / len(verdicts) if verdicts else 0.0
+        }
+
+    def report(self) -> Dict[str, int]:
+        with self._lock:
+            comparisons, skipped, entries, decided = self._usage
+        return {"comparisons": comparisons, "skipped": skipped, "entries": entries, "decided": decided}
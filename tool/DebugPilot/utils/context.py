@@ -0,0 +1,172 @@
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+from utils.tokens import count_tokens
+
+# entries after the test task, each starts a paragraph with one of these headers
+_ENTRY_START = re.compile(r'\n\n(?=analysis from |User insight:\n)')
+_ANALYSIS_HEADER = re.compile(r'analysis from (.*)\[(-?\d+):(-?\d+)\]:\n', re.S)
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+# condensed summaries keep their first sentence, at most this many characters
+CONDENSED_CHARS = 200
+
+
+def analysis_text(method_name: str, start_line: int, end_line: int, summary: str) -> str:
+    # appended to the context by Agent Comparison
+    return f"\n\nanalysis from {method_name}[{start_line}:{end_line}]:\n" + summary
+
+
+def insight_text(insight: str) -> str:
+    # appended to the context by interaction.py command 3
+    return f"\n\nUser insight:\n{insight}"
+
+
+class ContextEntry:
+    """One paragraph of the debugging context: the test task, an analysis summary of a block or a user insight"""
+    __slots__ = ("source", "method", "start_line", "end_line", "summary", "text")
+
+    def __init__(self, source: str, text: str, method: Optional[str] = None, start_line: Optional[int] = None,
+                 end_line: Optional[int] = None, summary: Optional[str] = None):
+        self.source = source
+        self.text = text
+        self.method = method
+        self.start_line = start_line
+        self.end_line = end_line
+        self.summary = summary if summary is not None else text
+
+    def condensed(self) -> str:
+        summary = self.summary.strip()
+        first = _SENTENCE_END.split(summary, 1)[0]
+        if len(first) > CONDENSED_CHARS:
+            first = first[:CONDENSED_CHARS].rstrip() + "..."
+        elif len(first) < len(summary):
+            first = first + " ..."
+        return f"analysis from {self.method}[{self.start_line}:{self.end_line}] (condensed):\n{first}"
+
+
+@lru_cache(maxsize=256)
+def parse_context(text: str) -> Tuple[ContextEntry, ...]:
+    # the paragraphs of a context string, the first one is the test task
+    parts = _ENTRY_START.split(text)
+    entries = [ContextEntry("test", parts[0])]
+    for part in parts[1:]:
+        match = _ANALYSIS_HEADER.match(part)
+        if match:
+            entries.append(ContextEntry("comparison", part, match.group(1), int(match.group(2)),
+                                        int(match.group(3)), part[match.end():]))
+        else:
+            entries.append(ContextEntry("user", part, summary=part[len("User insight:\n"):]))
+    return tuple(entries)
+
+
+class ContextManager:
+    """Token-budgeted views of the debugging context for the agent prompts
+
+    The context string saved in every state stays complete; an agent gets it verbatim while it fits the budget.
+    Otherwise the test task, user insights, the latest entries and the analyses of the current method are kept,
+    older analyses are condensed to their first sentence and the oldest are dropped.
+    """
+
+    def __init__(self, budget: int = 2048, recent: int = 3, model: str = "gpt-4o", cache_size: int = 4096):
+        # budget in tokens, 0 renders the whole context
+        self.budget = budget
+        self.recent = recent
+        self.model = model
+        self._lock = threading.Lock()
+        # token counts of the last cache_size texts (contexts, entries and their condensed forms)
+        self.cache_size = cache_size
+        self._tokens = OrderedDict()
+        # agent -> renders, renders over budget, context tokens, rendered tokens, entries kept / condensed / dropped
+        self._usage = {}
+
+    def tokens(self, text: str) -> int:
+        with self._lock:
+            tokens = self._tokens.get(text)
+            if tokens is not None:
+                self._tokens.move_to_end(text)
+                return tokens
+
+        tokens = count_tokens(text, self.model)
+        with self._lock:
+            self._tokens[text] = tokens
+            if len(self._tokens) > self.cache_size:
+                self._tokens.popitem(last=False)
+        return tokens
+
+    def render(self, context: str, agent: str, method_name: Optional[str] = None) -> str:
+        entries = parse_context(context)
+        total = self.tokens(context)
+        if not self.budget or total <= self.budget:
+            self._count(agent, False, total, total, len(entries), 0, 0)
+            return context
+
+        # newest first, the recent and relevant entries and user insights before the other ones:
+        # verbatim when they fit, else condensed, else dropped; other analyses are only shown condensed
+        remaining = self.budget - self.tokens(entries[0].text)
+        newest = range(len(entries) - 1, 0, -1)
+        priority = [position for position in newest if self._relevant(entries, position, method_name)]
+        rest = [position for position in newest if position not in priority]
+        chosen = {}
+        for position in priority + rest:
+            entry = entries[position]
+            if entry.source != "comparison":
+                forms = (entry.text,)
+            elif position in priority:
+                forms = (entry.text, entry.condensed())
+            else:
+                forms = (entry.condensed(),)
+            for form in forms:
+                tokens = self.tokens(form) + 1
+                if tokens <= remaining:
+                    chosen[position] = form
+                    remaining -= tokens
+                    break
+
+        # a marker stands where each run of dropped entries was
+        parts = [entries[0].text]
+        gap = 0
+        for position in range(1, len(entries) + 1):
+            if position < len(entries) and position not in chosen:
+                gap += 1
+                continue
+            if gap:
+                parts.append(f"[{gap} {'entry' if gap == 1 else 'entries'} omitted]")
+                gap = 0
+            if position < len(entries):
+                parts.append(chosen[position])
+        dropped = len(entries) - 1 - len(chosen)
+        view = "\n\n".join(parts)
+
+        condensed = sum(1 for position, form in chosen.items() if form != entries[position].text)
+        self._count(agent, True, total, self.tokens(view), 1 + len(chosen) - condensed, condensed, dropped)
+        return view
+
+    def _relevant(self, entries: Tuple[ContextEntry, ...], position: int, method_name: Optional[str]) -> bool:
+        entry = entries[position]
+        return (len(entries) - position <= self.recent or entry.source == "user"
+                or (method_name is not None and entry.method == method_name))
+
+    def _count(self, agent: str, over: bool, total: int, rendered: int, kept: int, condensed: int, dropped: int):
+        with self._lock:
+            usage = self._usage.setdefault(agent, [0, 0, 0, 0, 0, 0, 0])
+            for i, value in enumerate((1, int(over), total, rendered, kept, condensed, dropped)):
+                usage[i] += value
+
+    def report(self) -> List[Dict[str, Any]]:
+        # per agent: renders, renders over budget and tokens of the full context against the rendered views
+        with self._lock:
+            usage = {agent: list(counts) for agent, counts in self._usage.items()}
+        return [{
+            "agent": agent,
+            "renders": renders,
+            "over_budget": over,
+            "context_tokens": total,
+            "rendered_tokens": rendered,
+            "kept": kept,
+            "condensed": condensed,
+            "dropped": dropped
+        } for agent, (renders, over, total, rendered, kept, condensed, dropped) in usage.items()]
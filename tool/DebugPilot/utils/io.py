@@ -1,309 +1,325 @@
-import json
-from typing import Dict, List, Any, Tuple, Optional
-from utils.logger import get_logger
-
-
-class IOExtractor:
-    """Input/Output data extractor for trace analysis"""
-    
-    def __init__(self):
-        self.logger = get_logger("io_extractor")
-    
-    def get_data_dependency_reverse(self, data: List[Dict[str, Any]], current: int, 
-                                  write_var: Dict[str, Any], end_id: int) -> int:
-        try:
-            var_id = write_var.get("id")
-            head_id = write_var.get("alias_id")
-
-            for i in range(end_id + 1, len(data) + 1):
-                if i - 1 >= len(data):
-                    break
-                    
-                input_list = data[i - 1].get("input", [])
-                for input_var in input_list:
-                    if input_var.get("depend") != current:
-                        continue
-                    
-                    ivar_id = input_var.get("id")
-                    ihead_id = input_var.get("alias_id")
-
-                    if (ivar_id is not None and ivar_id == var_id):
-                        return i
-                    if (ihead_id is not None and ihead_id == head_id and ihead_id != "-1"):
-                        return i
-            for i in range(current + 1, end_id):
-                input_list = data[i - 1].get("input", [])
-                for input_var in input_list:
-                    if input_var.get("depend") != current:
-                        continue
-                    
-                    ivar_id = input_var.get("id")
-                    ihead_id = input_var.get("alias_id")
-
-                    if (ivar_id is not None and ivar_id == var_id):
-                        return i
-                    if (ihead_id is not None and ihead_id == head_id and ihead_id != "-1"):
-                        return i
-            
-            return -1
-        except Exception as e:
-            self.logger.error(f"Error in get_data_dependency_reverse: {str(e)}")
-            return -1
-
-    def build_variable_tree(self, variables: List[Dict[str, Any]], parent_depth: int, 
-                           start_idx: int) -> Tuple[List[Dict[str, Any]], int]:
-        try:
-            tree = []
-            idx = start_idx
-            while idx < len(variables):
-                node = variables[idx]
-                if node.get("depth", 0) <= parent_depth:
-                    break
-                
-                children, next_idx = self.build_variable_tree(variables, node.get("depth", 0), idx + 1)
-
-                tree.append({"var": node, "children": children})
-                idx = next_idx
-            return tree, idx
-        except Exception as e:
-            self.logger.error(f"Error in build_variable_tree: {str(e)}")
-            return [], start_idx
-
-    def extract_io_data(self, trace_data: List[Dict[str, Any]], current_call: int, 
-                       start_line: int, end_line: int, trace_fix: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
-        try:
-            first_execution = start_line
-            last_execution = end_line
-            
-            if first_execution == -1 or last_execution == -1:
-                self.logger.warning(f"Could not find execution range for lines {start_line}-{end_line}")
-                return {"block_read": [], "block_write": [], "invalue": "", "outvalue": ""}
-            
-            block_read = self._extract_block_read(trace_data, first_execution, last_execution, current_call, 3)
-            block_write = self._extract_block_write(trace_data, first_execution, last_execution, 10)
-            
-            if trace_fix:
-                trace_fix_read, trace_fix_write = self._process_trace_fix(trace_fix, first_execution, last_execution)
-                block_read.extend(trace_fix_read)
-                block_write.extend(trace_fix_write)
-            
-            invalue = self._format_input_values(block_read)
-            outvalue = self._format_output_values(block_write)
-            
-            return {
-                "block_read": block_read,
-                "block_write": block_write,
-                "invalue": invalue,
-                "outvalue": outvalue,
-                "execution_range": {
-                    "first": first_execution,
-                    "last": last_execution
-                }
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Error in extract_io_data: {str(e)}")
-            return {"block_read": [], "block_write": [], "invalue": "", "outvalue": ""}
-
-    def _process_trace_fix(self, trace_fix: List[Dict[str, Any]], first_execution: int, 
-                          last_execution: int) -> Tuple[List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]], 
-                                                       List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]]:
-        try:
-            fix_read = []
-            fix_write = []
-            
-            for fix_item in trace_fix:
-                trace_id = fix_item.get("trace_id", 0)
-                io_type = fix_item.get("io", "")
-                var_data = fix_item.get("var", {})
-                
-                if not (first_execution <= trace_id <= last_execution):
-                    continue
-                
-                var_tree = {"var": var_data, "children": []}
-                
-                if io_type == "input":
-                    fix_read.append((trace_id, var_data, -1, var_tree))
-                elif io_type == "output":
-                    fix_write.append((trace_id, var_data, -1, var_tree))
-            
-            return fix_read, fix_write
-            
-        except Exception as e:
-            self.logger.error(f"Error in _process_trace_fix: {str(e)}")
-            return [], []
-
-    def _find_first_execution(self, trace_data: List[Dict[str, Any]], current_call: int, 
-                             start_line: int, end_line: int) -> int:
-        try:
-            for i, trace in enumerate(trace_data):
-                if trace.get("trace_id", 0) >= current_call:
-                    line = trace.get("line", 0)
-                    if start_line <= line <= end_line:
-                        return trace.get("trace_id", i + 1)
-            return -1
-        except Exception as e:
-            self.logger.error(f"Error in _find_first_execution: {str(e)}")
-            return -1
-
-    def _find_last_execution(self, trace_data: List[Dict[str, Any]], current_call: int, 
-                            start_line: int, end_line: int) -> int:
-        try:
-            last_execution = -1
-            for i, trace in enumerate(trace_data):
-                if trace.get("trace_id", 0) >= current_call:
-                    line = trace.get("line", 0)
-                    if start_line <= line <= end_line:
-                        last_execution = trace.get("trace_id", i + 1)
-            return last_execution
-        except Exception as e:
-            self.logger.error(f"Error in _find_last_execution: {str(e)}")
-            return -1
-
-    def _extract_block_read(self, trace_data: List[Dict[str, Any]], begin_id: int, 
-                           end_id: int, current_call: int, ex_scope: int) -> List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]:
-        try:
-            block_read = []
-            depth0 = trace_data[begin_id].get("depth", 0)
-            
-            for i in range(begin_id, min(len(trace_data) + 1, end_id + 1)):
-                if i - 1 >= len(trace_data):
-                    break
-                    
-                trace = trace_data[i - 1]
-
-                if trace.get("depth") - depth0 > ex_scope:
-                    continue
-                
-                for j, read_var in enumerate(trace.get("input", [])):
-                    if read_var.get("depth", 0) != 0:
-                        continue
-                    
-                    depend = read_var.get("depend", -1)
-                    if depend >= begin_id:
-                        continue
-                    
-                    var_tree, _ = self.build_variable_tree(trace.get("input", []), 
-                                                         read_var.get("depth", 0), j + 1)
-                    var_tree = {"var": read_var, "children": var_tree}
-                    block_read.append((i, read_var, depend, var_tree))
-                
-                if trace.get("trace_id") == end_id:
-                    break
-            
-            return self._deduplicate_variables(block_read)
-            
-        except Exception as e:
-            self.logger.error(f"Error in _extract_block_read: {str(e)}")
-            return []
-
-    def _extract_block_write(self, trace_data: List[Dict[str, Any]], begin_id: int, 
-                            end_id: int, ex_scope: int) -> List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]:
-        try:
-            block_write = []
-            depth0 = trace_data[begin_id].get("depth", 0)
-            
-            for i in range(begin_id, min(len(trace_data) + 1, end_id + 1)):
-                if i - 1 >= len(trace_data):
-                    break
-                    
-                trace = trace_data[i - 1]
-
-                if trace.get("depth") - depth0 > ex_scope:
-                    continue
-                
-                for j, write_var in enumerate(trace.get("output", [])):
-                    if write_var.get("depth", 0) != 0:
-                        continue
-                    
-                    depend = write_var.get("reverse", -1)
-                    # self.get_data_dependency_reverse(trace_data, i, write_var, end_id)
-                    if depend <= end_id:
-                    # if depend <= end_id and depend != -1:
-                        continue
-                    
-                    var_tree, _ = self.build_variable_tree(trace.get("output", []), 
-                                                         write_var.get("depth", 0), j + 1)
-                    var_tree = {"var": write_var, "children": var_tree}
-                    block_write.append((i, write_var, depend, var_tree))
-                
-                if trace.get("trace_id") == end_id:
-                    break
-            
-            return self._deduplicate_variables(block_write)
-            
-        except Exception as e:
-            self.logger.error(f"Error in _extract_block_write: {str(e)}")
-            return []
-
-    def _deduplicate_variables(self, variables: List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]:
-        try:
-            unique_variables = []
-            seen_ids = set()
-            seen_alias = set()
-            
-            for item in variables:
-                var = item[1]
-                id_ = var.get("id")
-                alias_id = var.get("alias_id")
-                
-                if id_ in seen_ids:
-                    continue
-                if alias_id and alias_id != "-1" and alias_id in seen_alias:
-                    continue
-                
-                unique_variables.append(item)
-                seen_ids.add(id_)
-                if alias_id and alias_id != "-1":
-                    seen_alias.add(alias_id)
-            
-            return unique_variables
-        except Exception as e:
-            self.logger.error(f"Error in _deduplicate_variables: {str(e)}")
-            return variables
-
-    def _format_input_values(self, block_read: List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]) -> str:
-        try:
-            input_lines = []
-            for item in block_read:
-                tree = item[3]
-                formatted = self._format_tree_structure(tree, show_values=True)
-                input_lines.extend(formatted)
-            return "\n".join(input_lines)
-        except Exception as e:
-            self.logger.error(f"Error in _format_input_values: {str(e)}")
-            return ""
-
-    def _format_output_values(self, block_write: List[Tuple[int, Dict[str, Any], int, Dict[str, Any]]]) -> str:
-        try:
-            output_lines = []
-            for item in block_write:
-                tree = item[3]
-                formatted = self._format_tree_structure(tree, show_values=True)
-                output_lines.extend(formatted)
-            return "\n".join(output_lines)
-        except Exception as e:
-            self.logger.error(f"Error in _format_output_values: {str(e)}")
-            return ""
-
-    def _format_tree_structure(self, node: Dict[str, Any], show_values: bool = False, indent: int = 0) -> List[str]:
-        try:
-            lines = []
-            var = node.get("var", {})
-            type_ = var.get("type", "")
-            name = var.get("name", "")
-            value = var.get("value", "")
-            
-            if show_values:
-                lines.append("   " * indent + f"- \"type\": \"{type_}\", \"name\": \"{name}\", \"value\": \"{value}\"")
-            else:
-                lines.append("   " * indent + f"- \"type\": \"{type_}\", \"name\": \"{name}\"")
-            
-            for child in node.get("children", []):
-                child_lines = self._format_tree_structure(child, show_values, indent + 1)
-                lines.extend(child_lines)
-                
-            return lines
-        except Exception as e:
-            self.logger.error(f"Error in _format_tree_structure: {str(e)}")
-            return []
\ No newline at end of file
+import json
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple, Optional
+from utils.logger import get_logger
+from utils.serializer import ValueSerializer
+from utils.trace_index import (DependencyIndex, TraceFixIndex, VariableIndex, VariableTree,
+                               dependency_keys, iter_dependencies)
+from utils.trace_store import BaseTraceStore
+
+
+class IOExtractor:
+    """Input/Output data extractor for trace analysis"""
+    
+    def __init__(self, cache_size: int = 16384, accurate_dependency: bool = False, value_budget: int = 4096):
+        self.logger = get_logger("io_extractor")
+        # VariableIndex of the input/output list of visited steps, built once per trace and step
+        self.cache_size = cache_size
+        self._indexes = OrderedDict()
+        self._dependencies = None
+        self._trace = None
+        self._fix_index = None
+        # look up the first reader of each block output instead of trusting the precomputed "reverse"
+        self.accurate_dependency = accurate_dependency
+        # invalue / outvalue are each cut to value_budget tokens, 0 keeps them whole
+        self.serializer = ValueSerializer(value_budget)
+
+    def _use_trace(self, trace_data):
+        if trace_data is not self._trace:
+            self._trace = trace_data
+            self._indexes.clear()
+            self._dependencies = None
+
+    def dependency_index(self, trace_data):
+        # trace stores carry their def-use index, a plain step list gets one built on first use
+        if isinstance(trace_data, BaseTraceStore):
+            return trace_data
+        self._use_trace(trace_data)
+        if self._dependencies is None:
+            self._dependencies = DependencyIndex.build(iter_dependencies(trace_data), len(trace_data))
+        return self._dependencies
+
+    def _reads(self, step: Dict[str, Any], current: int, write_var: Dict[str, Any]) -> bool:
+        # step has an input depending on write_var of step current
+        var_id = write_var.get("id")
+        head_id = write_var.get("alias_id")
+        for input_var in step.get("input", []):
+            if input_var.get("depend") != current:
+                continue
+
+            ivar_id = input_var.get("id")
+            ihead_id = input_var.get("alias_id")
+
+            if (ivar_id is not None and ivar_id == var_id):
+                return True
+            if (ihead_id is not None and ihead_id == head_id and ihead_id != "-1"):
+                return True
+        return False
+
+    def get_data_dependency_reverse(self, data: List[Dict[str, Any]], current: int, 
+                                  write_var: Dict[str, Any], end_id: int) -> int:
+        # first step after end_id reading write_var of step current, else the first one in (current, end_id)
+        try:
+            keys = dependency_keys(write_var)
+            if not keys:
+                return -1
+            index = self.dependency_index(data)
+
+            for after, before in ((end_id, None), (current, end_id)):
+                consumer = index.next_consumer(current, keys, after, before)
+                # a key hash collision is skipped
+                while consumer is not None and not self._reads(data[consumer - 1], current, write_var):
+                    consumer = index.next_consumer(current, keys, consumer, before)
+                if consumer is not None:
+                    return consumer
+            
+            return -1
+        except Exception as e:
+            self.logger.error(f"Error in get_data_dependency_reverse: {str(e)}")
+            return -1
+
+    def variable_index(self, trace_data, trace_id: int, io_type: str) -> VariableIndex:
+        # io_type: "input" or "output" of step trace_id
+        self._use_trace(trace_data)
+
+        key = (trace_id, io_type)
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+            return index
+
+        index = VariableIndex(trace_data[trace_id - 1].get(io_type, []))
+        self._indexes[key] = index
+        if len(self._indexes) > self.cache_size:
+            self._indexes.popitem(last=False)
+        return index
+
+    def extract_io_data(self, trace_data: List[Dict[str, Any]], current_call: int, 
+                       start_line: int, end_line: int, trace_fix: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        try:
+            first_execution = start_line
+            last_execution = end_line
+            
+            if first_execution == -1 or last_execution == -1:
+                self.logger.warning(f"Could not find execution range for lines {start_line}-{end_line}")
+                return {"block_read": [], "block_write": [], "invalue": "", "outvalue": ""}
+
+            if isinstance(trace_data, BaseTraceStore):
+                # pull only the block's steps from the store (depth0 is read from first_execution + 1)
+                trace_data.load_range(first_execution, last_execution + 1)
+            
+            block_read, block_write = self._extract_block_io(trace_data, first_execution, last_execution, current_call, 3, 10)
+            
+            if trace_fix:
+                trace_fix_read, trace_fix_write = self._process_trace_fix(trace_fix, first_execution, last_execution)
+                block_read.extend(trace_fix_read)
+                block_write.extend(trace_fix_write)
+            
+            invalue, in_elided = self._format_input_values(block_read, trace_data)
+            outvalue, out_elided = self._format_output_values(block_write, trace_data)
+            
+            return {
+                "block_read": block_read,
+                "block_write": block_write,
+                "invalue": invalue,
+                "outvalue": outvalue,
+                "outvars": self._output_variables(block_write),
+                "elided": {"invalue": in_elided, "outvalue": out_elided},
+                "execution_range": {
+                    "first": first_execution,
+                    "last": last_execution
+                }
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error in extract_io_data: {str(e)}")
+            return {"block_read": [], "block_write": [], "invalue": "", "outvalue": ""}
+
+    def trace_fix_index(self, trace_fix: List[Dict[str, Any]]) -> TraceFixIndex:
+        # built once per trace_fix list
+        if self._fix_index is None or self._fix_index.trace_fix is not trace_fix:
+            self._fix_index = TraceFixIndex(trace_fix)
+        return self._fix_index
+
+    def _process_trace_fix(self, trace_fix: List[Dict[str, Any]], first_execution: int, 
+                          last_execution: int) -> Tuple[List[Tuple[int, Dict[str, Any], int, VariableTree]], 
+                                                       List[Tuple[int, Dict[str, Any], int, VariableTree]]]:
+        try:
+            fix_read = []
+            fix_write = []
+            
+            for fix_item in self.trace_fix_index(trace_fix).in_range(first_execution, last_execution):
+                trace_id = fix_item.get("trace_id", 0)
+                io_type = fix_item.get("io", "")
+                var_data = fix_item.get("var", {})
+                
+                var_tree = VariableTree.leaf(var_data)
+                
+                if io_type == "input":
+                    fix_read.append((trace_id, var_data, -1, var_tree))
+                elif io_type == "output":
+                    fix_write.append((trace_id, var_data, -1, var_tree))
+            
+            return fix_read, fix_write
+            
+        except Exception as e:
+            self.logger.error(f"Error in _process_trace_fix: {str(e)}")
+            return [], []
+
+    def _find_first_execution(self, trace_data: List[Dict[str, Any]], current_call: int, 
+                             start_line: int, end_line: int) -> int:
+        try:
+            for i, trace in enumerate(trace_data):
+                if trace.get("trace_id", 0) >= current_call:
+                    line = trace.get("line", 0)
+                    if start_line <= line <= end_line:
+                        return trace.get("trace_id", i + 1)
+            return -1
+        except Exception as e:
+            self.logger.error(f"Error in _find_first_execution: {str(e)}")
+            return -1
+
+    def _find_last_execution(self, trace_data: List[Dict[str, Any]], current_call: int, 
+                            start_line: int, end_line: int) -> int:
+        try:
+            last_execution = -1
+            for i, trace in enumerate(trace_data):
+                if trace.get("trace_id", 0) >= current_call:
+                    line = trace.get("line", 0)
+                    if start_line <= line <= end_line:
+                        last_execution = trace.get("trace_id", i + 1)
+            return last_execution
+        except Exception as e:
+            self.logger.error(f"Error in _find_last_execution: {str(e)}")
+            return -1
+
+    def _extract_block_io(self, trace_data: List[Dict[str, Any]], begin_id: int, end_id: int, current_call: int,
+                          read_scope: int, write_scope: int) -> Tuple[List[Tuple[int, Dict[str, Any], int, VariableTree]],
+                                                                      List[Tuple[int, Dict[str, Any], int, VariableTree]]]:
+        # block reads and writes in one sweep over the steps, each deduplicated on id / alias_id as it is found
+        # a step deeper than read_scope (write_scope) below the block adds no read (write)
+        try:
+            block_read = []
+            block_write = []
+            read_seen = (set(), set())
+            write_seen = (set(), set())
+            read_done = False
+            write_done = False
+            depth0 = trace_data[begin_id].get("depth", 0)
+            
+            for i in range(begin_id, min(len(trace_data) + 1, end_id + 1)):
+                if i - 1 >= len(trace_data):
+                    break
+                    
+                trace = trace_data[i - 1]
+                relative = trace.get("depth") - depth0
+                at_end = trace.get("trace_id") == end_id
+
+                if not read_done and relative <= read_scope:
+                    index = None
+                    for j, read_var in enumerate(trace.get("input", [])):
+                        if read_var.get("depth", 0) != 0:
+                            continue
+                        
+                        depend = read_var.get("depend", -1)
+                        if depend >= begin_id:
+                            continue
+                        
+                        if self._first_occurrence(read_var, read_seen):
+                            index = index or self.variable_index(trace_data, i, "input")
+                            block_read.append((i, read_var, depend, index.subtree(j)))
+                    read_done = at_end
+
+                if not write_done and relative <= write_scope:
+                    index = None
+                    for j, write_var in enumerate(trace.get("output", [])):
+                        if write_var.get("depth", 0) != 0:
+                            continue
+                        
+                        if self.accurate_dependency:
+                            depend = self.get_data_dependency_reverse(trace_data, i, write_var, end_id)
+                        else:
+                            depend = write_var.get("reverse", -1)
+                        if depend <= end_id:
+                        # if depend <= end_id and depend != -1:
+                            continue
+                        
+                        if self._first_occurrence(write_var, write_seen):
+                            index = index or self.variable_index(trace_data, i, "output")
+                            block_write.append((i, write_var, depend, index.subtree(j)))
+                    write_done = at_end
+
+                if read_done and write_done:
+                    break
+            
+            return block_read, block_write
+            
+        except Exception as e:
+            self.logger.error(f"Error in _extract_block_io: {str(e)}")
+            return [], []
+
+    @staticmethod
+    def _first_occurrence(var: Dict[str, Any], seen: Tuple[set, set]) -> bool:
+        # keep the first variable of each id and of each alias_id other than "-1"
+        seen_ids, seen_alias = seen
+        id_ = var.get("id")
+        alias_id = var.get("alias_id")
+        
+        if id_ in seen_ids:
+            return False
+        if alias_id and alias_id != "-1" and alias_id in seen_alias:
+            return False
+        
+        seen_ids.add(id_)
+        if alias_id and alias_id != "-1":
+            seen_alias.add(alias_id)
+        return True
+
+    def _format_input_values(self, block_read: List[Tuple[int, Dict[str, Any], int, VariableTree]],
+                             trace_data=None) -> Tuple[str, List[Dict[str, Any]]]:
+        try:
+            return self.serializer.serialize([item[3] for item in block_read], self._step_depths(block_read, trace_data))
+        except Exception as e:
+            self.logger.error(f"Error in _format_input_values: {str(e)}")
+            return "", []
+
+    def _format_output_values(self, block_write: List[Tuple[int, Dict[str, Any], int, VariableTree]],
+                              trace_data=None) -> Tuple[str, List[Dict[str, Any]]]:
+        try:
+            return self.serializer.serialize([item[3] for item in block_write], self._step_depths(block_write, trace_data))
+        except Exception as e:
+            self.logger.error(f"Error in _format_output_values: {str(e)}")
+            return "", []
+
+    @staticmethod
+    def _output_variables(block_write: List[Tuple[int, Dict[str, Any], int, VariableTree]],
+                          max_fields: int = 64) -> List[Dict[str, Any]]:
+        # name / type / full value of each block output and of its direct fields; array elements are listed instead
+        outvars = []
+        for item in block_write:
+            levels = list(item[3])
+            root = levels[0][1]
+            output = {"name": root.get("name", ""), "type": root.get("type", ""), "value": str(root.get("value", ""))}
+            fields = [var for level, var in levels[1:] if level == 1][:max_fields + 1]
+            if output["type"].endswith("[]") and 0 < len(fields) <= max_fields \
+                    and all(str(var.get("name", "")).endswith("]") for var in fields):
+                output["elements"] = [str(var.get("value", "")) for var in fields]
+                output["element_type"] = fields[0].get("type", "")
+                outvars.append(output)
+                continue
+            outvars.append(output)
+            for var in fields[:max_fields]:
+                outvars.append({"name": f"{output['name']}.{var.get('name', '')}", "type": var.get("type", ""),
+                                "value": str(var.get("value", ""))})
+        return outvars
+
+    @staticmethod
+    def _step_depths(items: List[Tuple[int, Dict[str, Any], int, VariableTree]], trace_data) -> Optional[List[int]]:
+        # call depth of the step each variable comes from: over budget, the ones of nested calls are dropped first
+        if trace_data is None:
+            return None
+        depths = []
+        for item in items:
+            step = item[0]
+            depths.append(trace_data[step - 1].get("depth", 0) if 0 < step <= len(trace_data) else 0)
+        return depths
\ No newline at end of file
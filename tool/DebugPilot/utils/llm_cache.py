@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional
+
+from utils.logger import get_logger
+
+
+def request_key(model: str, messages: List[Dict[str, Any]], **params) -> str:
+    # content address of a chat request: model, full message list and any sampling parameters
+    payload = {"model": model, "messages": messages, "params": params}
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cached_tokens(usage) -> int:
+    # prompt tokens the provider served from its prefix cache (sdk usage or a stored usage dict)
+    if usage is None:
+        return 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is not None:
+        value = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+        return value or 0
+    return getattr(usage, "cached_tokens", None) or 0
+
+
+def usage_dict(usage) -> Optional[Dict[str, Any]]:
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None),
+        "cached_tokens": cached_tokens(usage),
+        "estimated": bool(getattr(usage, "estimated", False))
+    }
+
+
+def make_response(content: str, model: str, usage: Optional[Dict[str, Any]] = None,
+                  cached: bool = True, finish_reason: str = "stop") -> SimpleNamespace:
+    # response-like object: agents only read response.choices[0].message.content
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+        usage=SimpleNamespace(**usage) if usage else None,
+        cached=cached
+    )
+
+
+class ResponseCache:
+    """Persistent LLM response cache keyed by a hash of the model and the full message list"""
+
+    DB_NAME = "llm_responses.db"
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.environ.get("DEBUGPILOT_CACHE_DIR", "cache")
+        self.db_path = os.path.join(self.cache_dir, self.DB_NAME)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.logger = get_logger("llm_cache")
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, created REAL, accessed REAL, "
+            "size INTEGER, content TEXT, usage TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.evict()
+
+    def get(self, key: str) -> Optional[SimpleNamespace]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, created, content, usage FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        model, _, content, usage = row
+        return make_response(content, model, json.loads(usage) if usage else None)
+
+    def put(self, key: str, model: str, response) -> None:
+        try:
+            content = response.choices[0].message.content
+        except (AttributeError, IndexError):
+            return
+        if content is None:
+            return
+
+        usage = usage_dict(getattr(response, "usage", None))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, len(content.encode('utf-8')), content,
+                 json.dumps(usage) if usage else None)
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        # drop expired entries, then the least recently used ones until the cache fits max_bytes
+        removed = 0
+        with self._lock:
+            if self.ttl:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                removed += len(stale)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
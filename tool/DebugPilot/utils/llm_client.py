@@ -1,27 +1,375 @@
-from openai import OpenAI
-import time
-
-class OpenAIClient():
-    def __init__(self):
-        # openai.api_key = os.environ["OPENAI_API_KEY"]
-        # openai.api_base = os.environ["OPENAI_API_BASE"]
-        self.client = OpenAI(
-            base_url="",
-            api_key=""
-        )
-    
-    def getResponse(self, **kwargs):
-        for _ in range(5):
-            try:
-                print(f"new message call. try...")
-                response = self.client.chat.completions.create(**kwargs, timeout=60)
-                time.sleep(0.2)
-                return response
-            except Exception as e:
-                if "service unavailable" in str(e).lower() or "503" in str(e):
-                    print("service unavailable error")
-                    time.sleep(1)
-                else:
-                    print(f"Error occurred: {e}.\n")
-                    time.sleep(1)
-        raise Exception("Failed to get response in 5 attempts.")
\ No newline at end of file
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Any, Optional
+
+from utils.llm_cache import ResponseCache, cached_tokens, make_response, request_key, usage_dict
+from utils.llm_replay import Cassette, RecordingBackend, ReplayBackend
+from utils.logger import get_logger
+from utils.tokens import count_tokens
+
+BASE_URL = os.environ.get("OPENAI_BASE_URL", "")
+API_KEY = os.environ.get("OPENAI_API_KEY", "")
+
+# status codes worth another attempt, everything else is a request error
+RETRY_STATUS = {408, 409, 429}
+
+_limit_lock = threading.Lock()
+_limit = threading.BoundedSemaphore(int(os.environ.get("DEBUGPILOT_LLM_CONCURRENCY", "8")))
+
+_pool_lock = threading.Lock()
+_pools = {}
+
+
+def set_concurrency_limit(limit: int):
+    # process-wide cap on in-flight llm calls, shared by every client
+    global _limit
+    with _limit_lock:
+        _limit = threading.BoundedSemaphore(max(1, limit))
+
+
+@contextmanager
+def _call_slot():
+    limit = _limit
+    limit.acquire()
+    try:
+        yield
+    finally:
+        limit.release()
+
+
+def _shared_clients(base_url: str, api_key: str, timeout: float, max_connections: int):
+    # one sdk client per endpoint, on a persistent connection pool
+    key = (base_url, api_key)
+    with _pool_lock:
+        client = _pools.get(key)
+        if client is None:
+            import httpx
+            from openai import OpenAI
+
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            client = OpenAI(base_url=base_url or None, api_key=api_key, max_retries=0,
+                            http_client=httpx.Client(limits=limits, timeout=timeout))
+            _pools[key] = client
+    return client
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    # seconds requested by the server through retry-after-ms / Retry-After
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return float(value) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class MalformedStream(Exception):
+    """Streamed output that can no longer be parsed, the generation was cancelled"""
+
+
+class StreamCollector:
+    """Accumulates streamed deltas until the closing tag of the answer block
+
+    A reply without the opening tag is read to its end, as a plain call would return it. The stream is
+    judged malformed only when the tag opens a second time before closing or the block grows past
+    max_length characters.
+    """
+
+    def __init__(self, stop: str, start: Optional[str] = "<format>", max_length: int = 32000):
+        self.stop = stop
+        self.start = start
+        self.max_length = max_length
+        self.content = ""
+        self.chunks = 0
+        self.usage = None
+        self.finished = False
+        self.finish_reason = None
+        self._start_pos = -1
+        self._scanned = 0
+
+    def feed(self, chunk) -> bool:
+        # True once the answer block is complete
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        choices = getattr(chunk, "choices", None)
+        if choices and getattr(choices[0], "finish_reason", None):
+            self.finish_reason = choices[0].finish_reason
+        text = getattr(choices[0].delta, "content", None) if choices else None
+        if not text:
+            return False
+
+        self.content += text
+        self.chunks += 1
+        # only the new text (plus a tag's length of overlap) is searched
+        scan_from = max(0, self._scanned - max(len(self.stop), len(self.start or "")))
+        self._scanned = len(self.content)
+
+        if self.start:
+            if self._start_pos == -1:
+                self._start_pos = self.content.find(self.start, scan_from)
+                if self._start_pos == -1:
+                    return False
+                scan_from = self._start_pos + len(self.start)
+
+        end = self.content.find(self.stop, scan_from)
+        if self.start:
+            reopened = self.content.find(self.start, max(scan_from, self._start_pos + len(self.start)))
+            if reopened != -1 and (end == -1 or reopened < end):
+                raise MalformedStream(f"{self.start} opened twice")
+        if end != -1:
+            self.content = self.content[:end + len(self.stop)]
+            self.finished = True
+            return True
+
+        if self.start and len(self.content) - self._start_pos > self.max_length:
+            raise MalformedStream(f"answer block longer than {self.max_length} characters")
+        return False
+
+    def response(self, model: str, messages: List[Dict[str, Any]]):
+        usage = self.usage
+        if usage is None:
+            # cancelled before the final usage chunk: counted here, and marked so it is not taken for the provider's
+            prompt_tokens = sum(count_tokens(message.get("content") or "", model) for message in messages)
+            completion_tokens = count_tokens(self.content, model)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens, "cached_tokens": None, "estimated": True}
+        else:
+            usage = usage_dict(usage)
+        return make_response(self.content, model, usage, cached=False,
+                             finish_reason="stop" if self.finished else self.finish_reason or "stop")
+
+
+def _stream_args(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(kwargs, stream=True, stream_options={"include_usage": True})
+
+
+def _truncate(response, stop: str):
+    # a backend without streaming (replay) returns the whole response, cut it like a stream would be
+    content = response.choices[0].message.content or ""
+    end = content.find(stop)
+    if end != -1:
+        response.choices[0].message.content = content[:end + len(stop)]
+    return response
+
+
+class LLMMetrics:
+    """Running totals of the latency and token usage of one client's calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # estimated: calls whose token counts were counted locally, the stream was closed before the usage chunk
+        self._totals = {"calls": 0, "cached": 0, "retries": 0, "estimated": 0, "latency": 0.0,
+                        "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+
+    def record(self, model: str, latency: float, usage, retries: int, cached: bool = False) -> Dict[str, Any]:
+        call = {
+            "model": model,
+            "latency": round(latency, 4),
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cached_tokens": cached_tokens(usage),
+            "estimated": bool(getattr(usage, "estimated", False)),
+            "retries": retries,
+            "cached": cached
+        }
+        with self._lock:
+            totals = self._totals
+            totals["calls"] += 1
+            totals["retries"] += retries
+            totals["estimated"] += int(call["estimated"])
+            if cached:
+                totals["cached"] += 1
+            else:
+                # answers from the response cache cost no time or tokens
+                for field in ("latency", "prompt_tokens", "completion_tokens", "cached_tokens"):
+                    totals[field] += call[field]
+        return call
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            summary = dict(self._totals)
+        summary["latency"] = round(summary["latency"], 4)
+        return summary
+
+
+class OpenAIClient():
+    def __init__(self, use_cache: bool = True, cache: ResponseCache = None,
+                 base_url: str = BASE_URL, api_key: str = API_KEY, timeout: float = 60,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0,
+                 max_connections: int = 20, mode: str = "live", cassette: str = None,
+                 replay_latency="recorded"):
+        self.logger = get_logger("llm_client")
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_connections = max_connections
+        self.metrics = LLMMetrics()
+        # called with the metrics record of every call, e.g. the span profiler
+        self.listeners = []
+        # read a stream on after stream_until for its final usage chunk: exact (and provider-cached) token counts
+        # at the cost of waiting for the rest of the generation
+        self.read_usage = False
+
+        # live: api calls, record: api calls saved to the cassette, replay: answers from the cassette only
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown llm mode: {mode}")
+        if mode != "live" and not cassette:
+            raise ValueError(f"llm mode {mode} needs a cassette file")
+        self.mode = mode
+        self.cassette = Cassette(cassette) if mode != "live" else None
+        self.replay_latency = replay_latency
+        self._backend = None
+        # per thread: (key, model, response) of the last call, cached once its agent commits it
+        self._pending = threading.local()
+
+        # identical requests (same model and messages) are answered from disk
+        # recording and replaying always go through the backend
+        if mode != "live":
+            self.cache = None
+        else:
+            self.cache = cache if cache is not None else (ResponseCache() if use_cache else None)
+
+    @property
+    def client(self):
+        if self._backend is None:
+            if self.mode == "replay":
+                self._backend = ReplayBackend(self.cassette, self.replay_latency)
+            else:
+                backend = _shared_clients(self.base_url, self.api_key, self.timeout, self.max_connections)
+                self._backend = RecordingBackend(backend, self.cassette) if self.mode == "record" else backend
+        return self._backend
+
+    def _cache_key(self, use_cache: bool, stream_until: Optional[str], kwargs: Dict[str, Any]) -> Optional[str]:
+        if self.cache is None or not use_cache or kwargs.get("stream"):
+            return None
+        params = {k: v for k, v in kwargs.items() if k not in ("model", "messages")}
+        # a reply cut at stream_until only answers requests cut at the same tag
+        if stream_until:
+            params["stream_until"] = stream_until
+        return request_key(kwargs.get("model"), kwargs.get("messages"), **params)
+
+    def _backoff(self, error: Exception, attempt: int) -> Optional[float]:
+        # seconds to wait before the next attempt, None if the error is not retryable
+        if not getattr(error, "retryable", True):
+            return None
+        status = _status_code(error)
+        if status is not None and status not in RETRY_STATUS and status < 500:
+            return None
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay) + random.uniform(0, self.base_delay / 4)
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _done(self, key: Optional[str], kwargs: Dict[str, Any], response, started: float, attempt: int):
+        call = self.metrics.record(kwargs.get("model"), time.perf_counter() - started,
+                                   getattr(response, "usage", None), attempt)
+        self._notify(call)
+        self.logger.debug(f"LLM call {call['model']}: {call['latency']:.2f}s, "
+                          f"{call['prompt_tokens']} prompt ({call['cached_tokens']} cached) / {call['completion_tokens']} completion tokens, "
+                          f"{attempt} retries")
+        self._pending.call = (key, kwargs.get("model"), response) if key is not None else None
+
+    def commit(self, response) -> None:
+        # cache a response once its agent has parsed it: an unusable answer is asked again instead of replayed
+        call = getattr(self._pending, "call", None)
+        if call is None or call[2] is not response:
+            return
+        self._pending.call = None
+        key, model, _ = call
+        self.cache.put(key, model, response)
+
+    def _cached(self, key: Optional[str], kwargs: Dict[str, Any]):
+        if key is None:
+            return None
+        response = self.cache.get(key)
+        if response is not None:
+            self._notify(self.metrics.record(kwargs.get("model"), 0.0, response.usage, 0, cached=True))
+        return response
+
+    def _notify(self, call: Dict[str, Any]):
+        for listener in self.listeners:
+            listener(call)
+
+    def _stream(self, kwargs: Dict[str, Any], stop: str):
+        stream = self.client.chat.completions.create(**_stream_args(kwargs), timeout=self.timeout)
+        if hasattr(stream, "choices"):
+            return _truncate(stream, stop)
+
+        collector = StreamCollector(stop)
+        chunks = iter(stream)
+        try:
+            for chunk in chunks:
+                if collector.feed(chunk):
+                    break
+            if self.read_usage and collector.finished:
+                # the answer is complete, the rest of the generation is not kept
+                for chunk in chunks:
+                    if getattr(chunk, "usage", None) is not None:
+                        collector.usage = chunk.usage
+                        break
+        finally:
+            # closing the connection cancels the rest of the generation
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        if collector.finished:
+            self.logger.debug(f"LLM stream stopped at {stop} after {collector.chunks} chunks")
+        return collector.response(kwargs.get("model"), kwargs.get("messages") or [])
+
+    def getResponse(self, use_cache: bool = True, stream_until: Optional[str] = None, **kwargs):
+        # stream_until: stream the completion and stop reading (cancel) once this closing tag arrives
+        key = self._cache_key(use_cache, stream_until, kwargs)
+        self._pending.call = None
+        cached = self._cached(key, kwargs)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        for attempt in range(self.max_retries):
+            try:
+                with _call_slot():
+                    if stream_until:
+                        try:
+                            response = self._stream(kwargs, stream_until)
+                        except MalformedStream as e:
+                            # the same prompt streamed again would most likely go wrong the same way
+                            self.logger.warning(f"LLM stream cancelled ({e}), asking once without streaming")
+                            response = self.client.chat.completions.create(**kwargs, timeout=self.timeout)
+                    else:
+                        response = self.client.chat.completions.create(**kwargs, timeout=self.timeout)
+                self._done(key, kwargs, response, started, attempt)
+                return response
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    self.logger.error(f"LLM request rejected: {e}")
+                    raise
+                self.logger.warning(f"LLM call failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt + 1 < self.max_retries:
+                    time.sleep(delay)
+        raise Exception(f"Failed to get response in {self.max_retries} attempts.")
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, Optional, Union
+
+from utils.llm_cache import make_response, request_key, usage_dict
+from utils.logger import get_logger
+
+# request arguments that do not change the answer
+TRANSPORT_ARGS = ("timeout", "stream", "stream_options")
+
+
+def cassette_key(kwargs: Dict[str, Any]) -> str:
+    params = {k: v for k, v in kwargs.items() if k not in ("model", "messages") + TRANSPORT_ARGS}
+    return request_key(kwargs.get("model"), kwargs.get("messages"), **params)
+
+
+class ReplayMiss(LookupError):
+    """The cassette holds no response for a request"""
+    retryable = False
+
+
+class Cassette:
+    """Recorded chat requests and responses, one json object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = get_logger("llm_replay")
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._served = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        self.logger.warning(f"Skipped cassette line {number} of {path}: {e}")
+                        continue
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, kwargs: Dict[str, Any], content: str, usage: Optional[Dict[str, Any]], latency: float):
+        entry = {
+            "key": cassette_key(kwargs),
+            "model": kwargs.get("model"),
+            "messages": kwargs.get("messages"),
+            "content": content,
+            "usage": usage,
+            "latency": round(latency, 4)
+        }
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def next(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # identical requests get their recorded responses in order, the last one repeats
+        key = cassette_key(kwargs)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise ReplayMiss(f"No recorded response for request {key[:12]} in {self.path}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        return entries[min(served, len(entries) - 1)]
+
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _RecordingStream:
+    """Streamed response that is saved to the cassette once consumed or closed, with the text received so far"""
+
+    def __init__(self, stream, cassette: Cassette, kwargs: Dict[str, Any], begin: float):
+        self._stream = stream
+        self._cassette = cassette
+        self._kwargs = kwargs
+        self._begin = begin
+        self._parts = []
+        self._usage = None
+        self._saved = False
+
+    def _collect(self, chunk):
+        if getattr(chunk, "usage", None) is not None:
+            self._usage = chunk.usage
+        choices = getattr(chunk, "choices", None)
+        if choices and getattr(choices[0].delta, "content", None):
+            self._parts.append(choices[0].delta.content)
+        return chunk
+
+    def _save(self):
+        if not self._saved:
+            self._saved = True
+            self._cassette.append(self._kwargs, "".join(self._parts), usage_dict(self._usage),
+                                  time.perf_counter() - self._begin)
+
+    def __iter__(self):
+        for chunk in self._stream:
+            yield self._collect(chunk)
+        self._save()
+
+    def close(self):
+        self._save()
+        close = getattr(self._stream, "close", None)
+        return close() if close else None
+
+
+class RecordingBackend:
+    """Wraps the sdk client and appends every completed chat request to a cassette"""
+
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self.cassette = cassette
+        self.chat = SimpleNamespace(completions=_Completions(self._create))
+
+    def _record(self, kwargs: Dict[str, Any], response, begin: float):
+        if kwargs.get("stream"):
+            return _RecordingStream(response, self.cassette, kwargs, begin)
+        self.cassette.append(kwargs, response.choices[0].message.content,
+                             usage_dict(getattr(response, "usage", None)), time.perf_counter() - begin)
+        return response
+
+    def _create(self, **kwargs):
+        begin = time.perf_counter()
+        return self._record(kwargs, self._client.chat.completions.create(**kwargs), begin)
+
+
+class ReplayBackend:
+    """Serves chat requests from a cassette, no network
+
+    latency is "recorded" to wait as long as the recorded call took, a number of seconds, or 0
+    streamed requests get the whole recorded response at once
+    """
+
+    def __init__(self, cassette: Cassette, latency: Union[str, float] = "recorded"):
+        self.cassette = cassette
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=_Completions(self._create))
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        if self.latency == "recorded":
+            return entry.get("latency") or 0.0
+        return float(self.latency or 0)
+
+    def _create(self, **kwargs):
+        entry = self.cassette.next(kwargs)
+        delay = self._delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return make_response(entry["content"], entry.get("model"), entry.get("usage"), cached=False)
+
+
+def parse_latency(value: str) -> Union[str, float]:
+    # --replay-latency: "recorded" or seconds
+    if value == "recorded":
+        return value
+    return float(value)
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+CALL_INFO = "call_info.json"
+CODE_INFO = "code_info.json"
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class BenchmarkMetadata:
+    """call_info.json and code_info.json of one <project>_<bug> directory, each parsed at most once
+
+    A missing or invalid file raises FileNotFoundError / json.JSONDecodeError when it is first used.
+    """
+
+    def __init__(self, benchmark_dir: str):
+        self.benchmark_dir = benchmark_dir
+        # reentrant: the lazy indexes are built under it from the files it also guards
+        self._lock = threading.RLock()
+        self._files = {}
+        self._methods = None
+        self._call_starts = None
+
+    def _load(self, name: str):
+        with self._lock:
+            if name not in self._files:
+                with open(os.path.join(self.benchmark_dir, name), 'r', encoding='utf-8') as f:
+                    self._files[name] = json.load(f)
+            return self._files[name]
+
+    @property
+    def call_info(self) -> List[Dict[str, Any]]:
+        return self._load(CALL_INFO)
+
+    @property
+    def code_info(self) -> Dict[str, Dict[str, Any]]:
+        return self._load(CODE_INFO)
+
+    def _method_index(self) -> Dict[str, Tuple[str, int, int]]:
+        # method name -> (src_path, start_line, end_line), without the method bodies
+        with self._lock:
+            if self._methods is None:
+                self._methods = {
+                    name: (info.get('src_path', ''), info.get('start_line', 0), info.get('end_line', 0))
+                    for name, info in self.code_info.items()
+                }
+            return self._methods
+
+    def src_path(self, method_name: str) -> str:
+        entry = self._method_index().get(method_name)
+        return entry[0] if entry else ""
+
+    def call_start(self, call_trace: int) -> Optional[int]:
+        # first trace step of the call with this call_trace id
+        with self._lock:
+            if self._call_starts is None:
+                starts = {}
+                for call_data in self.call_info:
+                    # the first entry wins, as with a scan of call_info
+                    starts.setdefault(call_data.get('call_trace'), call_data.get('start', 1))
+                self._call_starts = starts
+            return self._call_starts.get(call_trace)
+
+
+def _stamp(benchmark_dir: str) -> Tuple:
+    stamp = []
+    for name in (CALL_INFO, CODE_INFO):
+        try:
+            stat = os.stat(os.path.join(benchmark_dir, name))
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def get_metadata(benchmark_dir: str) -> BenchmarkMetadata:
+    # one BenchmarkMetadata per directory and process, replaced when either file changes on disk
+    key = os.path.abspath(benchmark_dir)
+    stamp = _stamp(key)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = _cache[key] = (stamp, BenchmarkMetadata(benchmark_dir))
+        return cached[1]
@@ -0,0 +1,135 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# span name prefix -> phase reported by profile_report.py
+PHASES = ("session", "agent", "llm", "parse", "state", "trace")
+
+
+def profiled(name: str):
+    # time a DebugEngine method as a span, a no-op when the engine has no profiler
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, "profiler", None)
+            if profiler is None:
+                return func(self, *args, **kwargs)
+            with profiler.span(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class SpanRecorder:
+    """Structured timing spans of one debugging session, appended as JSONL (spans.jsonl next to states.db)
+
+    Spans nest per thread; llm calls made inside a span add their tokens and retries to it and to its parents.
+    """
+
+    def __init__(self, path: str, bug: str):
+        self.path = path
+        self.bug = bug
+        self.run = None
+        # iteration / state of the main loop, copied into every span
+        self.context = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def begin_run(self):
+        self.run = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.context = {}
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        stack = self._stack()
+        frame = {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "llm_calls": 0, "retries": 0}
+        stack.append(frame)
+        started = time.time()
+        begin = time.perf_counter()
+        error = None
+        try:
+            yield frame
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - begin
+            stack.pop()
+            if stack:
+                for key in frame:
+                    stack[-1][key] += frame[key]
+
+            record = {
+                "run": self.run,
+                "bug": self.bug,
+                "name": name,
+                "start": round(started, 6),
+                "duration": round(duration, 6),
+                "depth": len(stack),
+                "thread": threading.current_thread().name
+            }
+            record.update(self.context)
+            record.update(frame)
+            record.update(fields)
+            if error:
+                record["error"] = error
+            self._write(record)
+
+    def llm_call(self, call: Dict[str, Any]):
+        # OpenAIClient listener: one "llm" span per call, tokens also count for the enclosing spans
+        stack = self._stack()
+        if stack:
+            frame = stack[-1]
+            frame["prompt_tokens"] += call["prompt_tokens"]
+            frame["cached_tokens"] += call["cached_tokens"]
+            frame["completion_tokens"] += call["completion_tokens"]
+            frame["llm_calls"] += 1
+            frame["retries"] += call["retries"]
+
+        record = {
+            "run": self.run,
+            "bug": self.bug,
+            "name": "llm",
+            "start": round(time.time() - call["latency"], 6),
+            "duration": call["latency"],
+            "depth": len(stack),
+            "thread": threading.current_thread().name,
+            "model": call["model"],
+            "cached": call["cached"]
+        }
+        record.update(self.context)
+        record.update({
+            "prompt_tokens": call["prompt_tokens"],
+            "cached_tokens": call["cached_tokens"],
+            "completion_tokens": call["completion_tokens"],
+            "estimated": call["estimated"],
+            "llm_calls": 1,
+            "retries": call["retries"]
+        })
+        self._write(record)
+
+
+def phase_of(name: str) -> Optional[str]:
+    phase = name.split(".", 1)[0]
+    return phase if phase in PHASES else None
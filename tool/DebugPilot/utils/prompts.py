@@ -0,0 +1,183 @@
+import os
+import string
+import threading
+from typing import Dict, List, Any, Iterable, Optional
+
+from utils.logger import get_logger
+from utils.tokens import count_tokens
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompt")
+
+# agent -> placeholders it supplies to prompt/agent_<agent>.txt
+# "system" opens every conversation with what stays the same for the whole session, and every agent
+# template puts its instructions before its input, so the provider can serve the prefix from its prompt cache
+AGENT_PARAMETERS = {
+    "system": ("test",),
+    "partition": ("code", "context", "stack"),
+    "selection": ("code", "context", "list"),
+    "selection_ranked": ("code", "context", "list"),
+    "abstraction": ("code", "context", "selected"),
+    "extraction": ("selected", "list", "context"),
+    "combination": ("code", "selected", "presentation", "expectation", "input", "output"),
+    "prediction": ("specification", "invalue", "context"),
+    "comparison": ("oracle", "outvalue"),
+    "localization": ("code", "context", "selected", "record")
+}
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+class PromptError(ValueError):
+    """A prompt template is unreadable, malformed or uses a placeholder its agent does not supply"""
+
+
+class PromptTemplate:
+    """A str.format template split once into (literal, placeholder, format_spec, conversion) segments"""
+
+    def __init__(self, name: str, text: str, path: Optional[str] = None, mtime: Optional[int] = None):
+        self.name = name
+        self.text = text
+        self.path = path
+        self.mtime = mtime
+
+        try:
+            parsed = list(string.Formatter().parse(text))
+        except ValueError as e:
+            raise PromptError(f"{name}: {e}")
+
+        self.segments = []
+        for literal, field, spec, conversion in parsed:
+            if field is not None and (not field.isidentifier() or "{" in (spec or "")):
+                raise PromptError(f"{name}: unsupported placeholder {{{field}}}")
+            self.segments.append((literal, field, spec or "", conversion))
+        self.placeholders = frozenset(field for _, field, _, _ in self.segments if field is not None)
+        self.static_text = "".join(literal for literal, _, _, _ in self.segments)
+
+    def render(self, params: Dict[str, Any]) -> str:
+        # same text as self.text.format(**params)
+        parts = []
+        for literal, field, spec, conversion in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            value = params[field]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            elif conversion == "s":
+                value = str(value)
+            parts.append(format(value, spec))
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """Agent prompt templates, read, validated and compiled once per process
+
+    refresh() recompiles the templates changed on disk, the daemon calls it before every command;
+    a changed template that fails validation is reported and the previous version stays in use.
+    """
+
+    def __init__(self, prompt_dir: str = PROMPT_DIR, agents: Optional[Dict[str, Iterable[str]]] = None,
+                 model: str = "gpt-4o"):
+        self.prompt_dir = prompt_dir
+        self.agents = {name: tuple(params) for name, params in (agents or AGENT_PARAMETERS).items()}
+        self.model = model
+        self.logger = get_logger("prompts")
+        self._lock = threading.Lock()
+        self._rejected = {}
+        # agent -> [renders, rendered tokens]
+        self._usage = {name: [0, 0] for name in self.agents}
+
+        self._templates = {name: self._load(name) for name in self.agents}
+        self.logger.debug("Prompt templates: " + ", ".join(
+            f"{row['prompt']} {row['template_tokens']}" for row in self.report()) + " tokens")
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.prompt_dir, f"agent_{name}.txt")
+
+    def _load(self, name: str) -> PromptTemplate:
+        path = self.path(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError as e:
+            raise PromptError(f"{name}: cannot read {path}: {e}")
+
+        template = PromptTemplate(name, text, path, mtime)
+        supplied = set(self.agents[name])
+        unknown = template.placeholders - supplied
+        if unknown:
+            raise PromptError(f"{path} uses {sorted(unknown)}, agent {name} only supplies {sorted(supplied)}")
+        unused = supplied - template.placeholders
+        if unused:
+            self.logger.warning(f"{path} does not use {sorted(unused)}")
+        return template
+
+    def refresh(self) -> List[str]:
+        # returns the reloaded agents
+        reloaded = []
+        for name, template in list(self._templates.items()):
+            try:
+                mtime = os.stat(template.path).st_mtime_ns
+            except OSError as e:
+                self.logger.warning(f"Kept the loaded {name} prompt: {e}")
+                continue
+            if mtime == template.mtime or mtime == self._rejected.get(name):
+                continue
+            try:
+                updated = self._load(name)
+            except PromptError as e:
+                self._rejected[name] = mtime
+                self.logger.warning(f"Kept the loaded {name} prompt: {e}")
+                continue
+            with self._lock:
+                self._templates[name] = updated
+            self._rejected.pop(name, None)
+            reloaded.append(name)
+        if reloaded:
+            self.logger.info(f"Reloaded prompts: {', '.join(reloaded)}")
+        return reloaded
+
+    def template(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **params) -> str:
+        template = self._templates[name]
+        missing = template.placeholders - params.keys()
+        if missing:
+            raise PromptError(f"{name}: no value for {sorted(missing)}")
+        text = template.render(params)
+        tokens = count_tokens(text, self.model)
+        with self._lock:
+            self._usage[name][0] += 1
+            self._usage[name][1] += tokens
+        return text
+
+    def report(self) -> List[Dict[str, Any]]:
+        # per prompt: tokens of the template text without its values, renders and rendered tokens so far
+        rows = []
+        with self._lock:
+            usage = {name: list(counts) for name, counts in self._usage.items()}
+        for name, template in self._templates.items():
+            renders, tokens = usage[name]
+            rows.append({
+                "prompt": name,
+                "template_tokens": count_tokens(template.static_text, self.model),
+                "renders": renders,
+                "rendered_tokens": tokens,
+                "mean_tokens": round(tokens / renders) if renders else 0
+            })
+        return rows
+
+
+def get_registry(prompt_dir: Optional[str] = None) -> PromptRegistry:
+    # one registry per prompt directory and process
+    key = os.path.abspath(prompt_dir or PROMPT_DIR)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = PromptRegistry(key)
+        return registry
@@ -0,0 +1,148 @@
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+from utils.tokens import count_tokens
+
+INDENT = "   "
+
+
+def format_variable(var: Dict[str, Any], level: int, value_chars: Optional[int] = None) -> str:
+    value = str(var.get("value", ""))
+    if value_chars is not None and len(value) > value_chars:
+        value = value[:value_chars] + f"...(+{len(value) - value_chars} chars elided)"
+    return INDENT * level + f"- \"type\": \"{var.get('type', '')}\", \"name\": \"{var.get('name', '')}\", \"value\": \"{value}\""
+
+
+class _Tree:
+    """Pre-order (level, var) list of one variable with the children of every node"""
+
+    def __init__(self, nodes: List[Tuple[int, Dict[str, Any]]]):
+        self.nodes = nodes
+        self.children = [[] for _ in nodes]
+        self.sizes = [1] * len(nodes)
+        stack = []
+        for i, (level, _) in enumerate(nodes):
+            while stack and nodes[stack[-1]][0] >= level:
+                stack.pop()
+            if stack:
+                self.children[stack[-1]].append(i)
+            stack.append(i)
+        for i in range(len(nodes) - 1, -1, -1):
+            for child in self.children[i]:
+                self.sizes[i] += self.sizes[child]
+
+
+class ValueSerializer:
+    """Block input / output values as invalue / outvalue text of at most budget tokens
+
+    A payload within the budget is written in full. Otherwise it is shortened step by step until it fits:
+    long values are cut, collections keep their first elements, deep fields are folded, and the variables
+    ranked last (deepest in the call tree) are left out. Every cut leaves a "..." marker line or suffix in
+    the text and an entry in the returned elision list.
+    """
+
+    # (value_chars, max_items, max_depth) tried in this order until the payload fits, None is unlimited
+    STEPS = [
+        (None, None, None),
+        (256, None, None),
+        (256, 20, None),
+        (128, 10, 4),
+        (128, 5, 2),
+        (64, 3, 1),
+        (64, 3, 0)
+    ]
+
+    def __init__(self, budget: int = 4096, model: str = "gpt-4o"):
+        # budget in tokens, 0 writes every payload in full
+        self.budget = budget
+        self.model = model
+
+    def serialize(self, trees: Sequence, ranks: Optional[Sequence[int]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        # trees: VariableTree (or any iterable of (level, var)) per variable; ranks: lower is kept longer
+        trees = [_Tree(list(tree)) for tree in trees]
+        text, elided = self._render(trees, None, None, None, len(trees), ranks)
+        if not self.budget or self._fits(text):
+            return text, elided
+
+        for value_chars, max_items, max_depth in self.STEPS[1:]:
+            text, elided = self._render(trees, value_chars, max_items, max_depth, len(trees), ranks)
+            if self._fits(text):
+                return text, elided
+
+        # the most shortened form is still too long: keep as many variables as fit, by rank
+        low, high = 0, len(trees) - 1
+        while low < high:
+            keep = (low + high + 1) // 2
+            if self._fits(self._render(trees, *self.STEPS[-1], keep, ranks)[0]):
+                low = keep
+            else:
+                high = keep - 1
+        text, elided = self._render(trees, *self.STEPS[-1], low, ranks)
+        if self._fits(text):
+            return text, elided
+        return self._cut(text, elided)
+
+    def _fits(self, text: str) -> bool:
+        # a token is at least one byte: short payloads need no tokenizer pass
+        if len(text.encode("utf-8")) <= self.budget:
+            return True
+        return count_tokens(text, self.model) <= self.budget
+
+    def _cut(self, text: str, elided: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        # last resort, a single line over budget: keep the lines that fit
+        lines = text.split("\n")
+        kept = []
+        for line in lines:
+            if not self._fits("\n".join(kept + [line, "- ... 0000000 lines elided"])):
+                break
+            kept.append(line)
+        cut = len(lines) - len(kept)
+        kept.append(f"- ... {cut} lines elided")
+        elided.append({"elided": "lines", "count": cut})
+        return "\n".join(kept), elided
+
+    def _render(self, trees: List[_Tree], value_chars: Optional[int], max_items: Optional[int],
+                max_depth: Optional[int], keep: int, ranks: Optional[Sequence[int]]) -> Tuple[str, List[Dict[str, Any]]]:
+        order = sorted(range(len(trees)), key=lambda i: (ranks[i] if ranks else 0, i))
+        kept = set(order[:keep])
+        lines = []
+        elided = []
+
+        for position, tree in enumerate(trees):
+            if position not in kept or not tree.nodes:
+                continue
+            root = tree.nodes[0][1].get("name", "")
+            # explicit stack: object graphs can nest deeper than the recursion limit
+            stack = [(0, False)]
+            while stack:
+                node, marker = stack.pop()
+                level, var = tree.nodes[node]
+                if marker:
+                    hidden = len(tree.children[node]) - max_items
+                    lines.append(INDENT * (level + 1) + f"- ... {hidden} more elements of \"{var.get('name', '')}\" elided")
+                    elided.append({"variable": root, "field": var.get("name", ""), "elided": "elements", "count": hidden})
+                    continue
+
+                line = format_variable(var, level, value_chars)
+                lines.append(line)
+                if value_chars is not None and len(str(var.get("value", ""))) > value_chars:
+                    elided.append({"variable": root, "field": var.get("name", ""), "elided": "chars",
+                                   "count": len(str(var.get("value", ""))) - value_chars})
+
+                children = tree.children[node]
+                if not children:
+                    continue
+                if max_depth is not None and level >= max_depth:
+                    hidden = tree.sizes[node] - 1
+                    lines.append(INDENT * (level + 1) + f"- ... {hidden} fields of \"{var.get('name', '')}\" elided")
+                    elided.append({"variable": root, "field": var.get("name", ""), "elided": "fields", "count": hidden})
+                    continue
+                shown = children if max_items is None else children[:max_items]
+                if len(shown) < len(children):
+                    stack.append((node, True))
+                stack.extend((child, False) for child in reversed(shown))
+
+        dropped = [trees[i].nodes[0][1].get("name", "") for i in order[keep:] if trees[i].nodes]
+        if dropped:
+            lines.append(f"- ... {len(dropped)} more variables elided: " + ", ".join(dropped))
+            elided.append({"elided": "variables", "count": len(dropped), "names": dropped})
+        return "\n".join(lines), elided
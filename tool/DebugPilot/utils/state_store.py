@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+StateKey = Tuple[int, int, int, int]
+
+STATE_FILE_PATTERN = re.compile(r'state_(\d+)_(\d+)_(\d+)_(\d+)\.json')
+
+
+def state_key(state: Sequence[int]) -> StateKey:
+    # (method, iteration, phase, step)
+    method, iteration, phase, step = state
+    return int(method), int(iteration), int(phase), int(step)
+
+
+class StateStore:
+    """Debug states of one session, kept in a single SQLite database keyed by (method, iteration, phase, step)
+
+    Every write bumps a change counter and records it against the methods it touched,
+    so the debugging plan (plan table) is only rebuilt for methods that changed.
+    """
+
+    DB_NAME = "states.db"
+
+    def __init__(self, result_dir: str):
+        self.result_dir = result_dir
+        self.db_path = os.path.join(result_dir, self.DB_NAME)
+        self.logger = get_logger("state_store")
+
+        os.makedirs(result_dir, exist_ok=True)
+        created = not os.path.exists(self.db_path)
+
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS states ("
+            "method INTEGER, iteration INTEGER, phase INTEGER, step INTEGER, "
+            "timestamp TEXT, data TEXT, "
+            "PRIMARY KEY (method, iteration, phase, step))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS changes (method INTEGER PRIMARY KEY, seq INTEGER)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plan (method INTEGER PRIMARY KEY, seq INTEGER, raw TEXT, enhanced TEXT)"
+        )
+
+        if created:
+            imported = self.import_json_dir()
+            if imported:
+                self.logger.info(f"Imported {imported} state files from {result_dir}")
+
+    @contextmanager
+    def transaction(self):
+        # group several writes, e.g. edit a state and drop everything after it
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def _touch(self, methods) -> int:
+        # called inside a transaction: next value of the monotonic change counter, recorded for each method
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()
+        seq = (row[0] if row else 0) + 1
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('seq', ?)", (seq,))
+        self._conn.executemany("INSERT OR REPLACE INTO changes VALUES (?, ?)", [(int(m), seq) for m in methods])
+        return seq
+
+    def _methods_from(self, state: Sequence[int]) -> List[int]:
+        return [row[0] for row in self._conn.execute(
+            "SELECT DISTINCT method FROM states WHERE (method, iteration, phase, step) > (?, ?, ?, ?)",
+            state_key(state)
+        )]
+
+    def save(self, state: Sequence[int], data: Dict[str, Any]) -> str:
+        # returns the stored json text
+        text = json.dumps(data, ensure_ascii=False)
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO states VALUES (?, ?, ?, ?, ?, ?)",
+                state_key(state) + (data.get("timestamp", ""), text)
+            )
+            self._touch([state[0]])
+        return text
+
+    def load_text(self, state: Sequence[int]) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM states WHERE method = ? AND iteration = ? AND phase = ? AND step = ?",
+                state_key(state)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self, state: Sequence[int]) -> Optional[Dict[str, Any]]:
+        text = self.load_text(state)
+        return json.loads(text) if text is not None else None
+
+    def exists(self, state: Sequence[int]) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM states WHERE method = ? AND iteration = ? AND phase = ? AND step = ?",
+                state_key(state)
+            ).fetchone()
+        return row is not None
+
+    def remove(self, state: Sequence[int]) -> bool:
+        with self.transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM states WHERE method = ? AND iteration = ? AND phase = ? AND step = ?",
+                state_key(state)
+            )
+            if cursor.rowcount:
+                self._touch([state[0]])
+        return cursor.rowcount > 0
+
+    def remove_after(self, state: Sequence[int]) -> int:
+        # drop every state ordered after the given one
+        with self.transaction():
+            methods = self._methods_from(state)
+            cursor = self._conn.execute(
+                "DELETE FROM states WHERE (method, iteration, phase, step) > (?, ?, ?, ?)",
+                state_key(state)
+            )
+            if methods:
+                self._touch(methods)
+        return cursor.rowcount
+
+    def clear(self) -> int:
+        with self.transaction():
+            methods = [row[0] for row in self._conn.execute("SELECT DISTINCT method FROM states")]
+            cursor = self._conn.execute("DELETE FROM states")
+            if methods:
+                self._touch(methods)
+        return cursor.rowcount
+
+    def keys(self) -> List[StateKey]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT method, iteration, phase, step FROM states ORDER BY method, iteration, phase, step"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def load_all(self) -> List[Tuple[StateKey, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT method, iteration, phase, step, data FROM states ORDER BY method, iteration, phase, step"
+            ).fetchall()
+        return [(tuple(row[:4]), json.loads(row[4])) for row in rows]
+
+    def load_method(self, method: int) -> List[Tuple[StateKey, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT method, iteration, phase, step, data FROM states WHERE method = ? "
+                "ORDER BY iteration, phase, step",
+                (int(method),)
+            ).fetchall()
+        return [(tuple(row[:4]), json.loads(row[4])) for row in rows]
+
+    def methods(self) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT method FROM states ORDER BY method").fetchall()
+        return [row[0] for row in rows]
+
+    def changes(self) -> Dict[int, int]:
+        # method -> change counter value of its last write
+        with self._lock:
+            rows = self._conn.execute("SELECT method, seq FROM changes").fetchall()
+        return dict(rows)
+
+    def plan_entries(self) -> Dict[int, Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]]:
+        # method -> (seq it was built at, plan entry, enhanced plan entry or None)
+        with self._lock:
+            rows = self._conn.execute("SELECT method, seq, raw, enhanced FROM plan").fetchall()
+        return {row[0]: (row[1], json.loads(row[2]), json.loads(row[3]) if row[3] is not None else None)
+                for row in rows}
+
+    def save_plan_entry(self, method: int, seq: int, raw: Dict[str, Any], enhanced: Optional[Dict[str, Any]]):
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan VALUES (?, ?, ?, ?)",
+                (int(method), seq, json.dumps(raw, ensure_ascii=False),
+                 json.dumps(enhanced, ensure_ascii=False) if enhanced is not None else None)
+            )
+
+    def remove_plan_entries(self, methods: Sequence[int]):
+        with self.transaction():
+            self._conn.executemany("DELETE FROM plan WHERE method = ?", [(int(m),) for m in methods])
+
+    def import_json_dir(self, directory: Optional[str] = None) -> int:
+        # import state_a_b_c_d.json files written by earlier versions
+        directory = directory or self.result_dir
+        if not os.path.isdir(directory):
+            return 0
+
+        count = 0
+        with self.transaction():
+            for filename in sorted(os.listdir(directory)):
+                match = STATE_FILE_PATTERN.fullmatch(filename)
+                if not match:
+                    continue
+                try:
+                    with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    self.logger.warning(f"Skipped state file {filename}: {e}")
+                    continue
+                self.save(tuple(map(int, match.groups())), data)
+                count += 1
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StateOverlay:
+    """States written by a speculative oracle chain, held in memory until committed; reads fall through to the store"""
+
+    def __init__(self, store: StateStore):
+        self.store = store
+        self.db_path = store.db_path
+        self.states = {}
+
+    def save(self, state: Sequence[int], data: Dict[str, Any]) -> str:
+        text = json.dumps(data, ensure_ascii=False)
+        self.states[state_key(state)] = text
+        return text
+
+    def load_text(self, state: Sequence[int]) -> Optional[str]:
+        text = self.states.get(state_key(state))
+        return text if text is not None else self.store.load_text(state)
+
+    def keys(self) -> List[StateKey]:
+        return sorted(self.states)
+
+    def load(self, state: Sequence[int]) -> Optional[Dict[str, Any]]:
+        text = self.load_text(state)
+        return json.loads(text) if text is not None else None
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # optional: without it token counts are estimated
+    tiktoken = None
+
+# tiktoken counts match the API, otherwise about four characters per token
+EXACT = tiktoken is not None
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
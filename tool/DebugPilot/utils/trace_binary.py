@@ -0,0 +1,237 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, List, Any, Iterator, Optional, Sequence
+
+from utils.logger import get_logger
+from utils.trace_index import DependencyIndex, step_dependencies
+from utils.trace_store import BaseTraceStore, iter_json_array
+
+# fixed-width int32 columns, everything else goes to the per-step blob
+COLUMNS = ("trace_id", "line", "depth", "son", "sip", "parent")
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+
+MAGIC = b"DPTRACE\x00"
+HEADER = struct.Struct("<8sIIQQ")  # magic, version, count, source_size, source_mtime
+MISSING = -2 ** 31  # column value is absent or not an int32, read it from the blob
+INT32_MAX = 2 ** 31 - 1
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class TraceStep(Mapping):
+    """One trace step: columns are read from the mmap, input/output are decoded on first access"""
+
+    __slots__ = ("_store", "_index", "_rest")
+
+    def __init__(self, store: "BinaryTraceStore", index: int):
+        self._store = store
+        self._index = index
+        self._rest = None
+
+    def _payload(self) -> Dict[str, Any]:
+        if self._rest is None:
+            self._rest = self._store._decode(self._index)
+        return self._rest
+
+    def __getitem__(self, key: str) -> Any:
+        column = COLUMN_INDEX.get(key)
+        if column is not None:
+            value = self._store._columns[column][self._index]
+            if value != MISSING:
+                return value
+        return self._payload()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for column, name in enumerate(COLUMNS):
+            if self._store._columns[column][self._index] != MISSING:
+                yield name
+        yield from self._payload()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"TraceStep({dict(self)!r})"
+
+
+class BinaryTraceStore(BaseTraceStore):
+    """Compact trace file: mmapped int32 columns plus an offset-indexed blob of json records
+
+    The def-use index (DependencyIndex arrays) sits between the record offsets and the blob.
+    """
+
+    FORMAT_VERSION = 2
+    FILE_NAME = "original.bin"
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self.logger = get_logger("trace_store")
+        self.cache_size = cache_size
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._lock = threading.Lock()
+        self._decoded = OrderedDict()
+
+        magic, version, count, _, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != self.FORMAT_VERSION:
+            raise ValueError(f"Not a trace file of version {self.FORMAT_VERSION}: {path}")
+        self._length = count
+
+        self._view = memoryview(self._mmap)
+        offset = _aligned(HEADER.size)
+        self._columns = []
+        for _ in COLUMNS:
+            self._columns.append(self._view[offset:offset + 4 * count].cast('i'))
+            offset = _aligned(offset + 4 * count)
+        self._offsets = self._view[offset:offset + 8 * (count + 1)].cast('q')
+        offset = _aligned(offset + 8 * (count + 1))
+
+        dep_offsets = self._view[offset:offset + 8 * (count + 2)].cast('q')
+        records = dep_offsets[count + 1]
+        offset = _aligned(offset + 8 * (count + 2))
+        dep_keys = self._view[offset:offset + 8 * records].cast('q')
+        offset = _aligned(offset + 8 * records)
+        dep_consumers = self._view[offset:offset + 4 * records].cast('i')
+        self._dependencies = DependencyIndex(dep_offsets, dep_keys, dep_consumers)
+        self._blob_start = _aligned(offset + 4 * records)
+
+    @classmethod
+    def open(cls, data_dir: str, **kwargs) -> "BinaryTraceStore":
+        json_path = os.path.join(data_dir, "original.json")
+        bin_path = os.path.join(data_dir, cls.FILE_NAME)
+
+        if not cls.is_current(json_path, bin_path):
+            if not os.path.exists(json_path):
+                raise FileNotFoundError(json_path)
+            cls.convert(json_path, bin_path)
+
+        return cls(bin_path, **kwargs)
+
+    @classmethod
+    def is_current(cls, json_path: str, bin_path: str) -> bool:
+        if not os.path.exists(bin_path):
+            return False
+        try:
+            with open(bin_path, 'rb') as f:
+                magic, version, _, source_size, source_mtime = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return False
+        if magic != MAGIC or version != cls.FORMAT_VERSION:
+            return False
+        if not os.path.exists(json_path):
+            return True
+
+        stat = os.stat(json_path)
+        return source_size == stat.st_size and source_mtime == int(stat.st_mtime)
+
+    @classmethod
+    def convert(cls, json_path: str, bin_path: str) -> int:
+        logger = get_logger("trace_store")
+        logger.info(f"Converting {json_path} to binary trace {bin_path}")
+
+        columns = [array('i') for _ in COLUMNS]
+        offsets = array('q', [0])
+        deps = []
+        directory = os.path.dirname(os.path.abspath(bin_path))
+
+        # the blob is spooled to disk first, its size is only known at the end
+        with tempfile.TemporaryFile(dir=directory) as blob:
+            for step in iter_json_array(json_path):
+                rest = {}
+                for key, value in step.items():
+                    column = COLUMN_INDEX.get(key)
+                    if column is None:
+                        rest[key] = value
+                for column, name in enumerate(COLUMNS):
+                    value = step.get(name)
+                    if (name in step and type(value) is int and MISSING < value <= INT32_MAX):
+                        columns[column].append(value)
+                    else:
+                        columns[column].append(MISSING)
+                        if name in step:
+                            rest[name] = value
+
+                record = json.dumps(rest, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                blob.write(record)
+                offsets.append(offsets[-1] + len(record))
+                deps.extend(step_dependencies(len(offsets) - 1, step))
+
+            count = len(offsets) - 1
+            dependencies = DependencyIndex.build(deps, count)
+            stat = os.stat(json_path)
+            tmp_path = bin_path + ".tmp"
+            with open(tmp_path, 'wb') as out:
+                out.write(HEADER.pack(MAGIC, cls.FORMAT_VERSION, count, stat.st_size, int(stat.st_mtime)))
+                for column in columns + [offsets, dependencies.offsets, dependencies.keys, dependencies.consumers]:
+                    out.write(b"\x00" * (_aligned(out.tell()) - out.tell()))
+                    column.tofile(out)
+                out.write(b"\x00" * (_aligned(out.tell()) - out.tell()))
+
+                blob.seek(0)
+                while True:
+                    chunk = blob.read(1 << 20)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+
+        os.replace(tmp_path, bin_path)
+        logger.info(f"Binary trace ready: {count} steps")
+        return count
+
+    def _decode(self, index: int) -> Dict[str, Any]:
+        with self._lock:
+            rest = self._decoded.get(index)
+            if rest is not None:
+                self._decoded.move_to_end(index)
+                return rest
+
+        start = self._blob_start + self._offsets[index]
+        end = self._blob_start + self._offsets[index + 1]
+        rest = json.loads(self._mmap[start:end])
+
+        with self._lock:
+            self._decoded[index] = rest
+            if len(self._decoded) > self.cache_size:
+                self._decoded.popitem(last=False)
+        return rest
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> TraceStep:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("trace index out of range")
+        return TraceStep(self, index)
+
+    def load_range(self, first_id: int, last_id: int) -> List[TraceStep]:
+        # nothing to prefetch: columns are mapped and records decode lazily
+        first = max(first_id, 1)
+        last = min(last_id, self._length)
+        return [TraceStep(self, trace_id - 1) for trace_id in range(first, last + 1)]
+
+    def next_consumer(self, producer: int, keys: Sequence[int], after: int,
+                      before: Optional[int] = None) -> Optional[int]:
+        return self._dependencies.next_consumer(producer, keys, after, before)
+
+    def close(self):
+        for column in self._columns:
+            column.release()
+        self._offsets.release()
+        self._dependencies.offsets.release()
+        self._dependencies.keys.release()
+        self._dependencies.consumers.release()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
@@ -0,0 +1,286 @@
+import hashlib
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+
+class CallLineIndex:
+    """Line index over the top-level steps (the son chain) of one method call
+
+    Resolves a block's source line range to its trace range with binary searches
+    instead of walking the son links from the call start.
+    """
+
+    def __init__(self, steps: List[int], lines: List[int], sips: List[int], call_end: int,
+                 truncated: bool = False):
+        self.steps = steps
+        self.lines = lines
+        self.sips = sips
+        self.call_end = call_end
+        # the chain ends on a son link pointing outside the recorded trace
+        self.truncated = truncated
+        self.end_pos = steps.index(call_end) if call_end in steps else -1
+
+        # running maximum of the lines: the first step reaching a line is a bisect
+        self.prefix_max = []
+        current = None
+        for line in lines:
+            current = line if current is None or line > current else current
+            self.prefix_max.append(current)
+
+        # max segment tree: the first step after a position leaving a line range
+        size = 1
+        while size < max(len(lines), 1):
+            size *= 2
+        self._size = size
+        self._tree = [None] * (2 * size)
+        for i, line in enumerate(lines):
+            self._tree[size + i] = line
+        for i in range(size - 1, 0, -1):
+            self._tree[i] = self._max(self._tree[2 * i], self._tree[2 * i + 1])
+
+    @staticmethod
+    def _max(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a if a >= b else b
+
+    @classmethod
+    def build(cls, trace_data: Sequence[Dict[str, Any]], call_start: int, call_end: int) -> "CallLineIndex":
+        steps, lines, sips = [], [], []
+        # trace stores hand out the line / son / sip of the call's steps in one read
+        links = trace_data.step_links(call_start, call_end) if hasattr(trace_data, "step_links") else {}
+        trace_id = call_start
+        while trace_id != -1:
+            if not 0 < trace_id <= len(trace_data):
+                return cls(steps, lines, sips, call_end, truncated=True)
+            link = links.get(trace_id)
+            if link is None:
+                step = trace_data[trace_id - 1]
+                link = (step["line"], step["son"], step["sip"])
+            steps.append(trace_id)
+            lines.append(link[0])
+            sips.append(link[2])
+            trace_id = link[1]
+        return cls(steps, lines, sips, call_end)
+
+    def _first_above(self, pos: int, line: int) -> int:
+        # first position >= pos whose line is greater than line, -1 if none
+        if pos >= len(self.lines):
+            return -1
+        node = self._size + pos
+        if self.lines[pos] > line:
+            return pos
+        # climb until a right sibling subtree holds a greater line
+        while node > 1:
+            if node % 2 == 0 and self._tree[node + 1] is not None and self._tree[node + 1] > line:
+                node += 1
+                break
+            node //= 2
+        else:
+            return -1
+        while node < self._size:
+            node = 2 * node if self._tree[2 * node] is not None and self._tree[2 * node] > line else 2 * node + 1
+        return node - self._size
+
+    def resolve(self, start_line: int, end_line: int) -> Optional[Tuple[int, int]]:
+        # trace range of the block [start_line, end_line] inside this call
+        # same result as following son links from the call start, None if the block is not executed
+        first = bisect_left(self.prefix_max, start_line)
+        if self.end_pos != -1 and (first >= len(self.lines) or self.end_pos < first):
+            first = self.end_pos
+        if first >= len(self.lines):
+            return None
+
+        if self.lines[first] < start_line or self.lines[first] > end_line:
+            return None
+
+        last = self._first_above(first, end_line)
+        if last == -1:
+            if self.truncated:
+                return None
+            return self.steps[first], self.call_end
+        return self.steps[first], self.sips[last]
+
+
+class ChildCallIndex:
+    """Child calls of every method call, sorted by the trace step they are made from"""
+
+    def __init__(self, call_info: List[Dict[str, Any]]):
+        self.call_info = call_info
+        self._starts = {}
+        self._calls = {}
+
+        for call_id, call_data in enumerate(call_info):
+            entries = []
+            for position, child_id in enumerate(call_data.get("call_list", [])):
+                child = call_info[child_id]
+                if child["call_trace"] == -1 or child["start"] == -1 or child["end"] == -1:
+                    continue
+                # a child call is made from the step just before its first step
+                entries.append((child["start"] - 1, position, child_id))
+            entries.sort()
+            self._starts[call_id] = [entry[0] for entry in entries]
+            self._calls[call_id] = [entry[2] for entry in entries]
+
+    def _bounds(self, call_id: int, first: int, last: int) -> Tuple[int, int]:
+        starts = self._starts.get(call_id, [])
+        return bisect_left(starts, first), bisect_right(starts, last)
+
+    def calls_in_range(self, call_id: int, first: int, last: int,
+                       offset: int = 0, limit: Optional[int] = None) -> List[int]:
+        # child calls of call_id made from trace steps first..last, in execution order
+        # offset/limit page through the result
+        low, high = self._bounds(call_id, first, last)
+        low += offset
+        if limit is not None:
+            high = min(high, low + limit)
+        return self._calls.get(call_id, [])[low:high] if low < high else []
+
+
+class VariableIndex:
+    """Nesting of a step's flat, depth-encoded input or output list, as offset arrays
+
+    The subtree of variables[k] is variables[k:ends[k]] and levels[k] is its nesting level,
+    so a variable tree is a slice of the list and is never rebuilt as nested dicts.
+    """
+
+    __slots__ = ("variables", "ends", "levels")
+
+    def __init__(self, variables: List[Dict[str, Any]]):
+        count = len(variables)
+        ends = array('i', [count]) * count
+        levels = array('i', [0]) * count
+        # open ancestors as (depth, position); a variable closes every open one at least as deep
+        stack = []
+        for position, var in enumerate(variables):
+            depth = var.get("depth", 0)
+            while stack and stack[-1][0] >= depth:
+                ends[stack.pop()[1]] = position
+            levels[position] = len(stack)
+            stack.append((depth, position))
+
+        self.variables = variables
+        self.ends = ends
+        self.levels = levels
+
+    def subtree(self, position: int) -> "VariableTree":
+        return VariableTree(self.variables, position, self.ends[position], self.levels)
+
+
+class VariableTree:
+    """One variable and its fields: variables[first:end] of a VariableIndex"""
+
+    __slots__ = ("variables", "first", "end", "levels")
+
+    def __init__(self, variables: List[Dict[str, Any]], first: int, end: int, levels: Sequence[int]):
+        self.variables = variables
+        self.first = first
+        self.end = end
+        self.levels = levels
+
+    @classmethod
+    def leaf(cls, var: Dict[str, Any]) -> "VariableTree":
+        return cls([var], 0, 1, (0,))
+
+    @property
+    def var(self) -> Dict[str, Any]:
+        return self.variables[self.first]
+
+    def __iter__(self):
+        # (indent relative to the root, variable) in pre-order
+        base = self.levels[self.first]
+        for position in range(self.first, self.end):
+            yield self.levels[position] - base, self.variables[position]
+
+
+class TraceFixIndex:
+    """trace_fix entries bucketed by trace_id: the entries of a block are a range lookup"""
+
+    def __init__(self, trace_fix: List[Dict[str, Any]]):
+        self.trace_fix = trace_fix
+        self.positions = sorted(range(len(trace_fix)), key=lambda position: trace_fix[position].get("trace_id", 0))
+        self.trace_ids = [trace_fix[position].get("trace_id", 0) for position in self.positions]
+
+    def in_range(self, first: int, last: int) -> List[Dict[str, Any]]:
+        # entries with first <= trace_id <= last, in trace_fix order
+        low = bisect_left(self.trace_ids, first)
+        high = bisect_right(self.trace_ids, last)
+        return [self.trace_fix[position] for position in sorted(self.positions[low:high])]
+
+
+def dependency_key(kind: str, value: Any) -> int:
+    # signed 64-bit hash of an id ("id") or alias_id ("alias"), collisions are checked against the step
+    digest = hashlib.blake2b(f"{kind}:{json.dumps(value)}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def dependency_keys(var: Dict[str, Any]) -> List[int]:
+    # what an input is matched on: its id, and its alias_id unless absent or "-1"
+    keys = []
+    if var.get("id") is not None:
+        keys.append(dependency_key("id", var["id"]))
+    alias_id = var.get("alias_id")
+    if alias_id is not None and alias_id != "-1":
+        keys.append(dependency_key("alias", alias_id))
+    return keys
+
+
+def step_dependencies(consumer: int, step: Dict[str, Any]) -> Iterator[Tuple[int, int, int]]:
+    # (producer trace_id, key, consumer trace_id) of every input of step consumer read from an earlier output
+    for var in step.get("input", []):
+        producer = var.get("depend", -1)
+        if type(producer) is not int or producer <= 0:
+            continue
+        for key in dependency_keys(var):
+            yield producer, key, consumer
+
+
+def iter_dependencies(steps: Iterable[Dict[str, Any]]) -> Iterator[Tuple[int, int, int]]:
+    for consumer, step in enumerate(steps, 1):
+        yield from step_dependencies(consumer, step)
+
+
+class DependencyIndex:
+    """Def-use index of a trace: the consumer steps of every (producer step, variable key)
+
+    Records are sorted by (producer, key, consumer); offsets[p]:offsets[p + 1] is producer p's slice of keys and
+    consumers, so a lookup is two bisects. The arrays may be memoryviews of a mapped trace file.
+    """
+
+    def __init__(self, offsets: Sequence[int], keys: Sequence[int], consumers: Sequence[int]):
+        self.offsets = offsets
+        self.keys = keys
+        self.consumers = consumers
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[int, int, int]], count: int) -> "DependencyIndex":
+        records = sorted({record for record in records if record[0] <= count})
+        offsets = array('q', [0]) * (count + 2)
+        for producer, _, _ in records:
+            offsets[producer + 1] += 1
+        for producer in range(1, count + 2):
+            offsets[producer] += offsets[producer - 1]
+        return cls(offsets,
+                   array('q', [record[1] for record in records]),
+                   array('i', [record[2] for record in records]))
+
+    def next_consumer(self, producer: int, keys: Sequence[int], after: int,
+                      before: Optional[int] = None) -> Optional[int]:
+        # first step after `after` (and before `before`) reading one of the keys from producer
+        if not 0 < producer < len(self.offsets) - 1:
+            return None
+        low, high = self.offsets[producer], self.offsets[producer + 1]
+        best = None
+        for key in keys:
+            first = bisect_left(self.keys, key, low, high)
+            last = bisect_right(self.keys, key, first, high)
+            position = bisect_right(self.consumers, after, first, last)
+            if position < last:
+                consumer = self.consumers[position]
+                if (before is None or consumer < before) and (best is None or consumer < best):
+                    best = consumer
+        return best
@@ -0,0 +1,292 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+from utils.trace_index import step_dependencies
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    # stream the elements of a top-level json array
+    # only the current element (plus one read chunk) is held in memory
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos >= len(buffer):
+                if eof:
+                    break
+                chunk = f.read(chunk_size)
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                eof = not chunk
+                continue
+
+            if not started:
+                if buffer[pos] != "[":
+                    raise json.JSONDecodeError("Expecting '['", buffer, pos)
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == "]":
+                break
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # an element touching the end of the buffer may still be incomplete
+                if end < len(buffer) or eof:
+                    yield item
+                    pos = end
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+
+            chunk = f.read(chunk_size)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            eof = not chunk
+
+
+def open_trace(data_dir: str, backend: str = "sqlite", **kwargs):
+    # open the step-level trace of a benchmark directory
+    # json: whole-file load, sqlite: indexed store, binary: memory-mapped columns
+    if backend == "json":
+        with open(os.path.join(data_dir, "original.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    if backend == "sqlite":
+        return TraceStore.open(data_dir, **kwargs)
+    if backend == "binary":
+        from utils.trace_binary import BinaryTraceStore
+        return BinaryTraceStore.open(data_dir, **kwargs)
+    raise ValueError(f"Unknown trace backend: {backend}")
+
+
+class BaseTraceStore(ABC):
+    """Common interface of the on-disk trace stores (a read-only list of steps)"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        ...
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for first in range(1, len(self) + 1, 1000):
+            yield from self.load_range(first, min(first + 999, len(self)))
+
+    @abstractmethod
+    def load_range(self, first_id: int, last_id: int) -> List[Dict[str, Any]]:
+        ...
+
+    def step_links(self, first_id: int, last_id: int) -> Dict[int, Tuple[Any, Any, Any]]:
+        # trace_id -> (line, son, sip) of the steps first_id..last_id, without their input/output
+        first = max(first_id, 1)
+        last = min(last_id, len(self))
+        links = {}
+        for trace_id in range(first, last + 1):
+            step = self[trace_id - 1]
+            links[trace_id] = (step.get("line"), step.get("son"), step.get("sip"))
+        return links
+
+    @abstractmethod
+    def next_consumer(self, producer: int, keys: Sequence[int], after: int,
+                      before: Optional[int] = None) -> Optional[int]:
+        # def-use lookup, see DependencyIndex.next_consumer
+        ...
+
+    def close(self):
+        pass
+
+
+class TraceStore(BaseTraceStore):
+    """Indexed on-disk copy of original.json, addressed like the original step list"""
+
+    SCHEMA_VERSION = 2
+    DB_NAME = "original.sqlite"
+
+    def __init__(self, db_path: str, cache_size: int = 4096):
+        self.db_path = db_path
+        self.logger = get_logger("trace_store")
+        self.cache_size = cache_size
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # guards the connection, the step cache and the load_range window
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._window = {}
+        self._length = self._conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]
+
+    @classmethod
+    def open(cls, data_dir: str, **kwargs) -> "TraceStore":
+        json_path = os.path.join(data_dir, "original.json")
+        db_path = os.path.join(data_dir, cls.DB_NAME)
+
+        if not cls.is_current(json_path, db_path):
+            if not os.path.exists(json_path):
+                raise FileNotFoundError(json_path)
+            cls.convert(json_path, db_path)
+
+        return cls(db_path, **kwargs)
+
+    @classmethod
+    def is_current(cls, json_path: str, db_path: str) -> bool:
+        if not os.path.exists(db_path):
+            return False
+        if not os.path.exists(json_path):
+            # the converted store is all we have
+            return True
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+
+        stat = os.stat(json_path)
+        return (meta.get("version") == str(cls.SCHEMA_VERSION) and
+                meta.get("source_size") == str(stat.st_size) and
+                meta.get("source_mtime") == str(int(stat.st_mtime)))
+
+    @classmethod
+    def convert(cls, json_path: str, db_path: str, batch_size: int = 2000) -> int:
+        logger = get_logger("trace_store")
+        logger.info(f"Converting {json_path} to indexed trace store {db_path}")
+
+        tmp_path = db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE steps ("
+                "trace_id INTEGER PRIMARY KEY, line INTEGER, depth INTEGER, "
+                "son INTEGER, sip INTEGER, parent INTEGER, step TEXT)"
+            )
+            # def-use index: the steps reading each (producer step, hashed id / alias_id)
+            conn.execute(
+                "CREATE TABLE deps (producer INTEGER, key INTEGER, consumer INTEGER, "
+                "PRIMARY KEY (producer, key, consumer)) WITHOUT ROWID"
+            )
+
+            count = 0
+            rows = []
+            deps = []
+            for step in iter_json_array(json_path):
+                count += 1
+                # steps are addressed by position, as original[trace_id - 1]
+                rows.append((count, step.get("line"), step.get("depth"), step.get("son"),
+                             step.get("sip"), step.get("parent"),
+                             json.dumps(step, ensure_ascii=False, separators=(',', ':'))))
+                deps.extend(step_dependencies(count, step))
+                if len(rows) >= batch_size:
+                    conn.executemany("INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                    conn.executemany("INSERT OR IGNORE INTO deps VALUES (?, ?, ?)", deps)
+                    rows = []
+                    deps = []
+            if rows:
+                conn.executemany("INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            if deps:
+                conn.executemany("INSERT OR IGNORE INTO deps VALUES (?, ?, ?)", deps)
+
+            stat = os.stat(json_path)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("version", str(cls.SCHEMA_VERSION)),
+                ("source_size", str(stat.st_size)),
+                ("source_mtime", str(int(stat.st_mtime))),
+                ("count", str(count))
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, db_path)
+        logger.info(f"Trace store ready: {count} steps")
+        return count
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("trace index out of range")
+
+        trace_id = index + 1
+        with self._lock:
+            step = self._window.get(trace_id)
+            if step is not None:
+                return step
+
+            step = self._cache.get(trace_id)
+            if step is not None:
+                self._cache.move_to_end(trace_id)
+                return step
+
+            row = self._conn.execute("SELECT step FROM steps WHERE trace_id = ?", (trace_id,)).fetchone()
+        step = json.loads(row[0])
+        with self._lock:
+            self._cache[trace_id] = step
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return step
+
+    def load_range(self, first_id: int, last_id: int) -> List[Dict[str, Any]]:
+        # fetch trace steps first_id..last_id (inclusive) with a single query
+        # the range stays resident until the next call
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT trace_id, step FROM steps WHERE trace_id BETWEEN ? AND ? ORDER BY trace_id",
+                (first_id, last_id)
+            ).fetchall()
+        window = {trace_id: json.loads(step) for trace_id, step in rows}
+        with self._lock:
+            self._window = window
+        return [window[trace_id] for trace_id, _ in rows]
+
+    def step_links(self, first_id: int, last_id: int) -> Dict[int, Tuple[Any, Any, Any]]:
+        # one query on the indexed columns, no step json is decoded
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT trace_id, line, son, sip FROM steps WHERE trace_id BETWEEN ? AND ?",
+                (first_id, last_id)
+            ).fetchall()
+        return {trace_id: (line, son, sip) for trace_id, line, son, sip in rows}
+
+    def next_consumer(self, producer: int, keys: Sequence[int], after: int,
+                      before: Optional[int] = None) -> Optional[int]:
+        best = None
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT MIN(consumer) FROM deps WHERE producer = ? AND key = ? AND consumer > ?",
+                    (producer, key, after)
+                ).fetchone()
+                if row[0] is not None and (best is None or row[0] < best):
+                    best = row[0]
+        return best if best is not None and (before is None or best < before) else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()